@@ -0,0 +1,111 @@
+"""Measure A2AClient.get_task against a local stub server.
+
+The "old" rows open a new httpx.AsyncClient (and TCP connection) per call,
+as A2AClient._send_request used to; the "new" rows reuse the pooled client.
+The stub is a keep-alive stdlib HTTP server answering every call with the
+same tasks/get response.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_client_pooling
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from common.client import A2AClient
+from common.types import GetTaskRequest, GetTaskResponse
+
+
+CALLS = 500
+CONCURRENCY = 32
+
+RESPONSE = json.dumps(
+    {
+        'jsonrpc': '2.0',
+        'id': '1',
+        'result': {'id': 'task-1', 'status': {'state': 'working'}},
+    }
+).encode()
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Buffer the response so headers and body go out in one segment.
+    wbufsize = -1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(RESPONSE)))
+        self.end_headers()
+        self.wfile.write(RESPONSE)
+
+    def log_message(self, *args):
+        pass
+
+
+class UnpooledA2AClient(A2AClient):
+    """The previous behaviour: one AsyncClient per request."""
+
+    async def _send_request(self, request):
+        async with httpx.AsyncClient() as client:
+            response = await client.post(
+                self.url, json=request.model_dump(), timeout=self.timeout
+            )
+            response.raise_for_status()
+            return response.json()
+
+
+async def _get_task(client: A2AClient) -> GetTaskResponse:
+    request = GetTaskRequest(params={'id': 'task-1'})
+    return GetTaskResponse(**await client._send_request(request))
+
+
+async def _run(client: A2AClient, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call():
+        async with semaphore:
+            await _get_task(client)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(CALLS)))
+    return CALLS / (time.perf_counter() - start)
+
+
+async def _bench(url: str):
+    print(f'{"client":>8}{"concurrency":>13}{"calls/s":>10}')
+    for concurrency in (1, CONCURRENCY):
+        for name, client in (
+            ('old', UnpooledA2AClient(url=url)),
+            ('new', A2AClient(url=url)),
+        ):
+            async with client:
+                rate = await _run(client, concurrency)
+            print(f'{name:>8}{concurrency:>13}{rate:>10.0f}')
+
+
+def main():
+    server = StubServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        asyncio.run(_bench(f'http://127.0.0.1:{server.server_port}/'))
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
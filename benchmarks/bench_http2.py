@@ -0,0 +1,150 @@
+"""Compare HTTP/1.1 and HTTP/2 (h2c) between A2AClient and A2AServer.
+
+Starts an A2AServer under Hypercorn, which serves both protocols on one
+port, with an agent that completes every task immediately. Then sends
+tasks/send calls at 1, 64 and 512 concurrent tasks over each protocol and
+reports throughput, p99 latency and the number of TCP connections opened.
+
+Needs the optional HTTP/2 dependencies:
+
+    pip install "httpx[http2]" hypercorn
+
+Run from the repository root:
+
+    python -m benchmarks.bench_http2
+"""
+
+import asyncio
+import socket
+import threading
+import time
+
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+
+from common.client import A2AClient
+from common.server import A2AServer, InMemoryTaskManager
+from common.types import (
+    AgentCapabilities,
+    AgentCard,
+    AgentSkill,
+    Message,
+    TaskState,
+    TaskStatus,
+    TextPart,
+)
+
+
+TASKS = 2000
+
+
+class ImmediateTaskManager(InMemoryTaskManager):
+    async def on_send_task(self, request):
+        async def work():
+            message = Message(role='agent', parts=[TextPart(text='done')])
+            return TaskStatus(state=TaskState.COMPLETED, message=message), None
+
+        return await self.submit_task(request, work)
+
+    async def on_send_task_subscribe(self, request):
+        raise NotImplementedError
+
+
+class _Server:
+    def __init__(self, port: int):
+        card = AgentCard(
+            name='bench',
+            url=f'http://127.0.0.1:{port}/',
+            version='1.0',
+            capabilities=AgentCapabilities(),
+            skills=[AgentSkill(id='bench', name='bench')],
+        )
+        self.app = A2AServer(
+            agent_card=card, task_manager=ImmediateTaskManager()
+        ).app
+        self.config = Config()
+        self.config.bind = [f'127.0.0.1:{port}']
+        self.config.accesslog = None
+        self.started = threading.Event()
+        self.thread = threading.Thread(target=asyncio.run, args=(self._run(),))
+
+    async def _run(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        self.loop.call_soon(self.started.set)
+        await serve(self.app, self.config, shutdown_trigger=self.stopping.wait)
+
+    def __enter__(self):
+        self.thread.start()
+        self.started.wait()
+        time.sleep(0.5)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.loop.call_soon_threadsafe(self.stopping.set)
+        self.thread.join()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def _run(url: str, http2: bool, concurrency: int):
+    connections = 0
+
+    async def trace(event_name, _info):
+        nonlocal connections
+        if event_name == 'connection.connect_tcp.complete':
+            connections += 1
+
+    async def add_trace(request):
+        request.extensions['trace'] = trace
+
+    message = {'role': 'user', 'parts': [{'type': 'text', 'text': 'hi'}]}
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with A2AClient(url=url, http2=http2) as client:
+        client.http_client.event_hooks['request'] = [add_trace]
+
+        async def send(i: int):
+            async with semaphore:
+                started = time.perf_counter()
+                await client.send_task(
+                    {'id': f'{http2}-{concurrency}-{i}', 'message': message}
+                )
+                latencies.append(time.perf_counter() - started)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send(i) for i in range(TASKS)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    return TASKS / elapsed, p99, connections
+
+
+def main():
+    port = _free_port()
+    url = f'http://127.0.0.1:{port}/'
+    with _Server(port):
+        print(
+            f'{"protocol":>9}{"concurrency":>13}{"tasks/s":>10}'
+            f'{"p99 ms":>9}{"conns":>7}'
+        )
+        for concurrency in (1, 64, 512):
+            for http2 in (False, True):
+                rate, p99, connections = asyncio.run(
+                    _run(url, http2, concurrency)
+                )
+                protocol = 'HTTP/2' if http2 else 'HTTP/1.1'
+                print(
+                    f'{protocol:>9}{concurrency:>13}{rate:>10.0f}'
+                    f'{p99 * 1e3:>9.1f}{connections:>7}'
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Measure push-notification JWT signing for each supported algorithm.
+
+Reports key generation time and signatures per second. Every signed body is
+distinct, so the per-second token cache never hits.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_jwt_signing
+"""
+
+import time
+
+from common.utils.push_notification_auth import (
+    SIGNING_KEY_PARAMS,
+    PushNotificationSenderAuth,
+)
+
+
+SIGNATURES = 2000
+
+
+def main():
+    print(f'{"algorithm":>10}{"keygen ms":>12}{"sign/s":>12}')
+    for algorithm in SIGNING_KEY_PARAMS:
+        auth = PushNotificationSenderAuth(algorithm=algorithm)
+        start = time.perf_counter()
+        auth.generate_jwk()
+        keygen = time.perf_counter() - start
+
+        bodies = [
+            {'id': f'task-{i}', 'status': {'state': 'working'}}
+            for i in range(SIGNATURES)
+        ]
+        start = time.perf_counter()
+        for body in bodies:
+            auth._generate_jwt(body)
+        elapsed = time.perf_counter() - start
+        print(
+            f'{algorithm:>10}{keygen * 1e3:>12.2f}'
+            f'{SIGNATURES / elapsed:>12.0f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Compare JSON-RPC parse + dispatch cost of the old and new A2AServer paths.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_request_dispatch
+"""
+
+import json
+import timeit
+
+from common.server.server import METHOD_HANDLERS
+from common.types import (
+    A2ARequest,
+    CancelTaskRequest,
+    GetTaskPushNotificationRequest,
+    GetTaskRequest,
+    SendTaskRequest,
+    SendTaskStreamingRequest,
+    SetTaskPushNotificationRequest,
+    TaskResubscriptionRequest,
+)
+
+
+MESSAGE = {'role': 'user', 'parts': [{'type': 'text', 'text': 'Find flights'}]}
+
+REQUESTS = {
+    'tasks/get': {'id': 'task-1', 'historyLength': 10},
+    'tasks/send': {'id': 'task-1', 'sessionId': 'session-1', 'message': MESSAGE},
+    'tasks/sendSubscribe': {
+        'id': 'task-1',
+        'sessionId': 'session-1',
+        'message': MESSAGE,
+    },
+    'tasks/cancel': {'id': 'task-1'},
+    'tasks/pushNotification/set': {
+        'id': 'task-1',
+        'pushNotificationConfig': {'url': 'http://localhost:9000/notify'},
+    },
+    'tasks/pushNotification/get': {'id': 'task-1'},
+    'tasks/resubscribe': {'id': 'task-1'},
+}
+
+
+def _old_dispatch(body: bytes) -> str:
+    json_rpc_request = A2ARequest.validate_python(json.loads(body))
+    if isinstance(json_rpc_request, GetTaskRequest):
+        return 'on_get_task'
+    if isinstance(json_rpc_request, SendTaskRequest):
+        return 'on_send_task'
+    if isinstance(json_rpc_request, SendTaskStreamingRequest):
+        return 'on_send_task_subscribe'
+    if isinstance(json_rpc_request, CancelTaskRequest):
+        return 'on_cancel_task'
+    if isinstance(json_rpc_request, SetTaskPushNotificationRequest):
+        return 'on_set_task_push_notification'
+    if isinstance(json_rpc_request, GetTaskPushNotificationRequest):
+        return 'on_get_task_push_notification'
+    if isinstance(json_rpc_request, TaskResubscriptionRequest):
+        return 'on_resubscribe_to_task'
+    raise ValueError(f'Unexpected request type: {type(json_rpc_request)}')
+
+
+def _new_dispatch(body: bytes) -> str:
+    json_rpc_request = A2ARequest.validate_json(body)
+    return METHOD_HANDLERS[json_rpc_request.method]
+
+
+def main(number: int = 20000):
+    print(f'{"method":<30}{"old us/op":>12}{"new us/op":>12}{"speedup":>10}')
+    for method, params in REQUESTS.items():
+        body = json.dumps(
+            {'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params}
+        ).encode()
+        assert _old_dispatch(body) == _new_dispatch(body)
+
+        old = min(timeit.repeat(lambda: _old_dispatch(body), number=number))
+        new = min(timeit.repeat(lambda: _new_dispatch(body), number=number))
+        print(
+            f'{method:<30}{old / number * 1e6:>12.2f}'
+            f'{new / number * 1e6:>12.2f}{old / new:>9.2f}x'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Measure tasks/get (handler + JSON rendering) for long task histories.
+
+The old path copies the task, slices the history and serializes every
+returned message on each request. The new path takes a tail of the
+MessageHistory and splices in the memoized JSON of its messages.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_task_history
+"""
+
+import asyncio
+import time
+
+from common.server.server import PydanticJSONResponse
+from common.server.task_manager import InMemoryTaskManager
+from common.types import (
+    GetTaskRequest,
+    GetTaskResponse,
+    Message,
+    TaskSendParams,
+    TaskState,
+    TaskStatus,
+    TextPart,
+)
+
+
+POLLS = 200
+
+
+class HistoryTaskManager(InMemoryTaskManager):
+    async def on_send_task(self, request):
+        raise NotImplementedError
+
+    async def on_send_task_subscribe(self, request):
+        raise NotImplementedError
+
+
+def _old_get_task(task, history_length):
+    new_task = task.model_copy()
+    if history_length is not None and history_length > 0:
+        new_task.history = new_task.history[-history_length:]
+    else:
+        new_task.history = []
+    return GetTaskResponse(id='1', result=new_task)
+
+
+async def _build(history_size: int) -> HistoryTaskManager:
+    manager = HistoryTaskManager()
+    message = Message(role='user', parts=[TextPart(text='Find hotels')])
+    await manager.upsert_task(TaskSendParams(id='task-1', message=message))
+    for i in range(history_size - 1):
+        reply = Message(
+            role='agent', parts=[TextPart(text=f'Hotel option number {i}')]
+        )
+        status = TaskStatus(state=TaskState.WORKING, message=reply)
+        await manager.update_store('task-1', status, None)
+    return manager
+
+
+async def _run(history_size: int, history_length: int | None):
+    manager = await _build(history_size)
+    task = await manager.task_store.get('task-1')
+    request = GetTaskRequest(
+        id='1', params={'id': 'task-1', 'historyLength': history_length}
+    )
+    polls = POLLS if history_size < 10000 else POLLS // 10
+
+    start = time.perf_counter()
+    for _ in range(polls):
+        PydanticJSONResponse(_old_get_task(task, history_length))
+    old = (time.perf_counter() - start) / polls
+
+    start = time.perf_counter()
+    for _ in range(polls):
+        PydanticJSONResponse(await manager.on_get_task(request))
+    new = (time.perf_counter() - start) / polls
+    return old, new
+
+
+def main():
+    print(f'{"history":>8}{"length":>8}{"old us":>12}{"new us":>12}')
+    for history_size in (10, 1000, 10000):
+        for history_length in (None, 10, history_size):
+            old, new = asyncio.run(_run(history_size, history_length))
+            print(
+                f'{history_size:>8}{str(history_length):>8}'
+                f'{old * 1e6:>12.1f}{new * 1e6:>12.1f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
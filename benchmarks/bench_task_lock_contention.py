@@ -0,0 +1,88 @@
+"""Measure tasks/get latency while other tasks run slow update_store calls.
+
+A single lock stripe reproduces the old global-lock behaviour, so the
+stripes=1 row is the baseline.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_task_lock_contention
+"""
+
+import asyncio
+import statistics
+import time
+
+from common.server.task_manager import InMemoryTaskManager
+from common.types import (
+    GetTaskRequest,
+    Message,
+    TaskSendParams,
+    TaskState,
+    TaskStatus,
+    TextPart,
+)
+
+
+UPDATE_DELAY = 0.001
+UPDATES_PER_TASK = 20
+POLLS_PER_TASK = 20
+
+
+class SlowUpdateTaskManager(InMemoryTaskManager):
+    """Holds the task lock across a simulated slow persistence write."""
+
+    async def on_send_task(self, request):
+        raise NotImplementedError
+
+    async def on_send_task_subscribe(self, request):
+        raise NotImplementedError
+
+    async def update_store(self, task_id, status, artifacts):
+        async with self.task_lock(task_id):
+            await asyncio.sleep(UPDATE_DELAY)
+        return await super().update_store(task_id, status, artifacts)
+
+
+async def _run(num_tasks: int, lock_stripes: int) -> list[float]:
+    manager = SlowUpdateTaskManager(lock_stripes=lock_stripes)
+    message = Message(role='user', parts=[TextPart(text='Find hotels')])
+    task_ids = [f'task-{i}' for i in range(num_tasks)]
+    for task_id in task_ids:
+        await manager.upsert_task(TaskSendParams(id=task_id, message=message))
+
+    latencies = []
+
+    async def updater(task_id: str):
+        status = TaskStatus(state=TaskState.WORKING)
+        for _ in range(UPDATES_PER_TASK):
+            await manager.update_store(task_id, status, None)
+
+    async def poller(task_id: str):
+        request = GetTaskRequest(params={'id': task_id})
+        for _ in range(POLLS_PER_TASK):
+            start = time.perf_counter()
+            await manager.on_get_task(request)
+            latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0)
+
+    # Half of the tasks are being updated, the other half are only polled.
+    half = num_tasks // 2
+    await asyncio.gather(
+        *(updater(task_id) for task_id in task_ids[:half]),
+        *(poller(task_id) for task_id in task_ids[half:]),
+    )
+    return latencies
+
+
+def main():
+    print(f'{"tasks":>8}{"stripes":>9}{"p50 ms":>10}{"p99 ms":>10}')
+    for num_tasks in (10, 100, 1000):
+        for lock_stripes in (1, 64):
+            latencies = sorted(asyncio.run(_run(num_tasks, lock_stripes)))
+            p50 = statistics.median(latencies) * 1e3
+            p99 = latencies[int(len(latencies) * 0.99) - 1] * 1e3
+            print(f'{num_tasks:>8}{lock_stripes:>9}{p50:>10.3f}{p99:>10.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Compare JSON and MessagePack for tasks/get responses.
+
+Each representative Task is encoded the way A2AServer renders it and
+decoded the way A2AClient parses it. JSON carries file content as base64
+text; MessagePack carries it as raw bytes. FileContent keeps the decoded
+bytes after the first binary dump, so the MessagePack encode times are
+those of repeated renders (e.g. polling). FileContent.bytes stays base64
+text, so decoding a MessagePack file part base64-encodes it again, which
+makes it somewhat slower than decoding the JSON (about 20% for 1 MB)
+while the body is about 25% smaller. Needs the msgpack package.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_wire_format
+"""
+
+import base64
+import json
+import os
+import time
+
+from common.server.server import MessagePackResponse, PydanticJSONResponse
+from common.types import (
+    Artifact,
+    DataPart,
+    FileContent,
+    FilePart,
+    GetTaskResponse,
+    Message,
+    Task,
+    TaskState,
+    TaskStatus,
+    TextPart,
+)
+from common.utils.wire_format import unpackb
+
+
+ROUNDS = 200
+
+
+def _task(parts: list, history_size: int = 2) -> Task:
+    history = [
+        Message(
+            role='user' if i % 2 == 0 else 'agent',
+            parts=[TextPart(text=f'Find me a hotel in Paris, option {i}')],
+        )
+        for i in range(history_size)
+    ]
+    return Task(
+        id='task-1',
+        sessionId='session-1',
+        status=TaskStatus(state=TaskState.COMPLETED),
+        artifacts=[Artifact(name='result', parts=parts)],
+        history=history,
+    )
+
+
+def _file_part(size: int) -> FilePart:
+    content = base64.b64encode(os.urandom(size)).decode('ascii')
+    return FilePart(
+        file=FileContent(name='image.png', mimeType='image/png', bytes=content)
+    )
+
+
+def _tasks() -> dict[str, Task]:
+    hotels = [
+        {
+            'name': f'Hotel {i}',
+            'price': 120.5 + i,
+            'rating': 4.2,
+            'amenities': ['wifi', 'breakfast', 'pool'],
+        }
+        for i in range(200)
+    ]
+    return {
+        'chat (50 msgs)': _task(
+            [TextPart(text='Here is your itinerary. ' * 20)], history_size=50
+        ),
+        'data (200 rows)': _task([DataPart(data={'hotels': hotels})]),
+        'file 64 KB': _task([_file_part(64 * 1024)]),
+        'file 1 MB': _task([_file_part(1024 * 1024)]),
+    }
+
+
+def _time(fn, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds
+
+
+def _run(task: Task) -> list[float]:
+    response = GetTaskResponse(id='1', result=task)
+    rounds = ROUNDS if len(PydanticJSONResponse(response).body) < 1e5 else 20
+
+    json_body = PydanticJSONResponse(response).body
+    msgpack_body = MessagePackResponse(response).body
+    return [
+        len(json_body),
+        len(msgpack_body),
+        _time(lambda: PydanticJSONResponse(response), rounds),
+        _time(lambda: MessagePackResponse(response), rounds),
+        _time(lambda: GetTaskResponse(**json.loads(json_body)), rounds),
+        _time(lambda: GetTaskResponse(**unpackb(msgpack_body)), rounds),
+    ]
+
+
+def main():
+    print(
+        f'{"task":<16}{"json B":>10}{"msgpack B":>11}'
+        f'{"enc json us":>13}{"enc mp us":>11}'
+        f'{"dec json us":>13}{"dec mp us":>11}'
+    )
+    for name, task in _tasks().items():
+        json_size, msgpack_size, *timings = _run(task)
+        enc_json, enc_mp, dec_json, dec_mp = (t * 1e6 for t in timings)
+        print(
+            f'{name:<16}{json_size:>10}{msgpack_size:>11}'
+            f'{enc_json:>13.1f}{enc_mp:>11.1f}'
+            f'{dec_json:>13.1f}{dec_mp:>11.1f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,10 @@
-from .card_resolver import A2ACardResolver
-from .client import A2AClient
+from .card_resolver import A2ACardDirectory, A2ACardResolver
+from .client import A2AClient, new_http_client
 
 
-__all__ = ['A2ACardResolver', 'A2AClient']
\ No newline at end of file
+__all__ = [
+    'A2ACardDirectory',
+    'A2ACardResolver',
+    'A2AClient',
+    'new_http_client',
+]
\ No newline at end of file
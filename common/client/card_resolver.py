@@ -1,23 +1,242 @@
+import asyncio
 import json
+import logging
+import re
+import threading
+import time
+
+from collections.abc import Iterable
 
 import httpx
 
 from common.types import (
     A2AClientJSONError,
     AgentCard,
+    AgentSkill,
 )
 
 
+logger = logging.getLogger(__name__)
+
+
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+def _max_age(cache_control: str | None) -> int:
+    """Seconds a card may be served without revalidation (0 if unknown)."""
+    if not cache_control or 'no-cache' in cache_control:
+        return 0
+    match = _MAX_AGE_RE.search(cache_control)
+    return int(match.group(1)) if match else 0
+
+
 class A2ACardResolver:
+    # Shared by all resolvers in the process: url -> (card, etag, expires_at)
+    _cache: dict[str, tuple[AgentCard, str | None, float]] = {}
+    _cache_lock = threading.Lock()
+
     def __init__(self, base_url, agent_card_path='/.well-known/agent.json'):
         self.base_url = base_url.rstrip('/')
         self.agent_card_path = agent_card_path.lstrip('/')
 
     def get_agent_card(self) -> AgentCard:
+        """Returns the agent card, revalidating a stale cached copy with
+        If-None-Match instead of downloading it again.
+        """
+        url = self.base_url + '/' + self.agent_card_path
+        with self._cache_lock:
+            cached = self._cache.get(url)
+
+        headers = {}
+        if cached is not None:
+            card, etag, expires_at = cached
+            if time.monotonic() < expires_at:
+                return card
+            if etag:
+                headers['If-None-Match'] = etag
+
         with httpx.Client() as client:
-            response = client.get(self.base_url + '/' + self.agent_card_path)
+            response = client.get(url, headers=headers)
+
+        if response.status_code == 304 and cached is not None:
+            card = cached[0]
+            etag = response.headers.get('etag', cached[1])
+        else:
+            response.raise_for_status()
+            try:
+                card = AgentCard(**response.json())
+            except json.JSONDecodeError as e:
+                raise A2AClientJSONError(str(e)) from e
+            etag = response.headers.get('etag')
+
+        expires_at = time.monotonic() + _max_age(
+            response.headers.get('cache-control')
+        )
+        with self._cache_lock:
+            self._cache[url] = (card, etag, expires_at)
+        return card
+
+
+class _CardEntry:
+    __slots__ = ('card', 'etag', 'fresh_until', 'stale_until')
+
+    def __init__(
+        self,
+        card: AgentCard,
+        etag: str | None,
+        fresh_until: float,
+        stale_until: float,
+    ):
+        self.card = card
+        self.etag = etag
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class A2ACardDirectory:
+    """Async, cached discovery of many agents' cards.
+
+    Cards are fetched concurrently over one pooled httpx.AsyncClient and
+    kept for the server's Cache-Control max-age, or ttl seconds if it sends
+    none. For stale_ttl seconds after that the cached card is still
+    returned while a background request revalidates it (with If-None-Match
+    when the server sent an ETag). Concurrent lookups of the same agent
+    share one request. Skills are indexed by their tags for find_skills().
+    """
+
+    def __init__(
+        self,
+        base_urls: Iterable[str] = (),
+        http_client: httpx.AsyncClient | None = None,
+        ttl: float = 300.0,
+        stale_ttl: float = 3600.0,
+        agent_card_path: str = '/.well-known/agent.json',
+    ):
+        self.base_urls = [url.rstrip('/') for url in base_urls]
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.agent_card_path = agent_card_path.lstrip('/')
+        self._owns_http_client = http_client is None
+        self.http_client = http_client or httpx.AsyncClient(timeout=10)
+        # base url -> cached card
+        self._entries: dict[str, _CardEntry] = {}
+        # base url -> request in flight
+        self._fetches: dict[str, asyncio.Task] = {}
+        # lower-cased tag -> base url -> skills of that agent with the tag
+        self._skills_by_tag: dict[str, dict[str, list[AgentSkill]]] = {}
+
+    async def aclose(self):
+        for fetch in self._fetches.values():
+            fetch.cancel()
+        if self._owns_http_client:
+            await self.http_client.aclose()
+
+    async def __aenter__(self) -> 'A2ACardDirectory':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def get_agent_card(self, base_url: str) -> AgentCard:
+        base_url = base_url.rstrip('/')
+        entry = self._entries.get(base_url)
+        now = time.monotonic()
+        if entry is not None and now < entry.stale_until:
+            if now >= entry.fresh_until:
+                self._fetch(base_url)
+            return entry.card
+        return await asyncio.shield(self._fetch(base_url))
+
+    async def resolve_all(
+        self, base_urls: Iterable[str] | None = None
+    ) -> dict[str, AgentCard]:
+        """Resolves the agents concurrently.
+
+        Defaults to the base_urls given at construction. Agents that cannot
+        be reached are logged and left out of the result.
+        """
+        base_urls = [
+            url.rstrip('/')
+            for url in (self.base_urls if base_urls is None else base_urls)
+        ]
+        cards = await asyncio.gather(
+            *(self.get_agent_card(url) for url in base_urls),
+            return_exceptions=True,
+        )
+        resolved = {}
+        for base_url, card in zip(base_urls, cards, strict=True):
+            if isinstance(card, Exception):
+                logger.warning(f'Could not resolve agent {base_url}: {card}')
+            else:
+                resolved[base_url] = card
+        return resolved
+
+    def find_skills(self, tag: str) -> list[tuple[AgentCard, AgentSkill]]:
+        """Returns the skills of the resolved agents that carry the tag."""
+        return [
+            (self._entries[base_url].card, skill)
+            for base_url, skills in self._skills_by_tag.get(
+                tag.lower(), {}
+            ).items()
+            for skill in skills
+        ]
+
+    def _fetch(self, base_url: str) -> asyncio.Task:
+        fetch = self._fetches.get(base_url)
+        if fetch is None:
+            fetch = asyncio.create_task(self._refresh(base_url))
+            self._fetches[base_url] = fetch
+            fetch.add_done_callback(
+                lambda _: self._fetches.pop(base_url, None)
+            )
+            # A failed background revalidation only logs; the stale card
+            # stays in use.
+            fetch.add_done_callback(self._log_failure)
+        return fetch
+
+    @staticmethod
+    def _log_failure(fetch: asyncio.Task):
+        if not fetch.cancelled() and fetch.exception() is not None:
+            logger.warning(f'Agent card refresh failed: {fetch.exception()}')
+
+    async def _refresh(self, base_url: str) -> AgentCard:
+        entry = self._entries.get(base_url)
+        headers = {}
+        if entry is not None and entry.etag:
+            headers['If-None-Match'] = entry.etag
+
+        response = await self.http_client.get(
+            f'{base_url}/{self.agent_card_path}', headers=headers
+        )
+        if response.status_code == 304 and entry is not None:
+            card = entry.card
+            etag = response.headers.get('etag', entry.etag)
+        else:
             response.raise_for_status()
             try:
-                return AgentCard(**response.json())
+                card = AgentCard(**response.json())
             except json.JSONDecodeError as e:
-                raise A2AClientJSONError(str(e)) from e
\ No newline at end of file
+                raise A2AClientJSONError(str(e)) from e
+            etag = response.headers.get('etag')
+
+        cache_control = response.headers.get('cache-control')
+        max_age = _max_age(cache_control) if cache_control else self.ttl
+        now = time.monotonic()
+        self._entries[base_url] = _CardEntry(
+            card, etag, now + max_age, now + max_age + self.stale_ttl
+        )
+        if entry is None or entry.card is not card:
+            self._index_skills(base_url, card)
+        return card
+
+    def _index_skills(self, base_url: str, card: AgentCard):
+        for agents in self._skills_by_tag.values():
+            agents.pop(base_url, None)
+        for skill in card.skills:
+            for tag in {tag.lower() for tag in skill.tags or ()}:
+                self._skills_by_tag.setdefault(tag, {}).setdefault(
+                    base_url, []
+                ).append(skill)
+        self._skills_by_tag = {
+            tag: agents for tag, agents in self._skills_by_tag.items() if agents
+        }
@@ -1,12 +1,17 @@
+import asyncio
 import json
+import logging
+import random
+import time
 
-from collections.abc import AsyncIterable
+from collections import deque
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
 from typing import Any
 
 import httpx
 
 from httpx._types import TimeoutTypes
-from httpx_sse import connect_sse
+from httpx_sse import aconnect_sse
 
 from common.types import (
     A2AClientHTTPError,
@@ -19,21 +24,116 @@ from common.types import (
     GetTaskRequest,
     GetTaskResponse,
     JSONRPCRequest,
+    JSONRPCResponse,
+    ListTasksRequest,
+    ListTasksResponse,
     SendTaskRequest,
     SendTaskResponse,
     SendTaskStreamingRequest,
     SendTaskStreamingResponse,
     SetTaskPushNotificationRequest,
     SetTaskPushNotificationResponse,
+    TaskResubscriptionRequest,
+    TaskStatusUpdateEvent,
 )
+from common.utils.wire_format import (
+    MSGPACK_ACCEPT,
+    MSGPACK_MEDIA_TYPE,
+    MessagePackDecodeError,
+    dump_binary,
+    is_msgpack,
+    msgpack_available,
+    packb,
+    unpackb,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Keeps fire-and-forget tasks referenced until they finish.
+_background_tasks: set[asyncio.Task] = set()
+
+# Each open SSE stream holds a connection, so the pool is sized for
+# hundreds of concurrent subscriptions.
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=512, max_keepalive_connections=64, keepalive_expiry=30.0
+)
+
+# SSE streams stay open for as long as the task runs.
+STREAM_TIMEOUT = httpx.Timeout(None, connect=10.0)
+
+# Methods that are safe to send more than once (retries and hedging).
+IDEMPOTENT_METHODS = frozenset(
+    {'tasks/get', 'tasks/list', 'tasks/pushNotification/get'}
+)
+
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+def new_http_client(
+    url: str, http2: bool = False, **kwargs
+) -> httpx.AsyncClient:
+    """Creates a pooled AsyncClient for talking to the agent at url.
+
+    With http2, concurrent requests and SSE streams are multiplexed over
+    few connections: https URLs negotiate HTTP/2 through ALPN, plain http
+    URLs use HTTP/2 with prior knowledge (h2c), which the agent must serve
+    (see A2AServer.start). Requires the h2 package (httpx[http2]).
+    """
+    prior_knowledge = http2 and url.startswith('http://')
+    return httpx.AsyncClient(http2=http2, http1=not prior_knowledge, **kwargs)
+
+
+RESPONSE_TYPES: dict[type[JSONRPCRequest], type[JSONRPCResponse]] = {
+    SendTaskRequest: SendTaskResponse,
+    GetTaskRequest: GetTaskResponse,
+    CancelTaskRequest: CancelTaskResponse,
+    SetTaskPushNotificationRequest: SetTaskPushNotificationResponse,
+    GetTaskPushNotificationRequest: GetTaskPushNotificationResponse,
+    ListTasksRequest: ListTasksResponse,
+}
 
 
 class A2AClient:
+    """JSON-RPC client for one A2A agent.
+
+    Requests share one pooled httpx.AsyncClient, so connections to the
+    agent are kept alive between calls. Pass http_client to share a pool
+    between several A2AClients; it is then left open by aclose(). Otherwise
+    the client is created on first use with the given limits and closed by
+    aclose() or on leaving an `async with` block.
+
+    A numeric timeout is the deadline of a whole call: an attempt still
+    running at the deadline is cancelled with TimeoutError, and retries
+    only get the time that is left. Idempotent methods (IDEMPOTENT_METHODS)
+    are retried up to max_retries times after transport errors and
+    retryable status codes, with full-jitter exponential backoff starting
+    at retry_backoff seconds. With hedge_percentile set (e.g. 0.95), a
+    tasks/get that has not answered within that percentile of recent
+    tasks/get latencies is sent a second time, and the first answer wins.
+
+    http2 opts into HTTP/2 for the created client; see new_http_client.
+
+    With msgpack set and the msgpack package installed, requests advertise
+    MessagePack in their Accept header. Once the server answers in
+    MessagePack, requests are sent in it too, with file content as raw
+    bytes; servers that ignore the header keep getting JSON. Streams stay
+    JSON.
+    """
+
     def __init__(
         self,
         agent_card: AgentCard = None,
         url: str = None,
         timeout: TimeoutTypes = 60.0,
+        http_client: httpx.AsyncClient | None = None,
+        limits: httpx.Limits = DEFAULT_LIMITS,
+        max_stream_reconnects: int = 3,
+        max_retries: int = 2,
+        retry_backoff: float = 0.1,
+        hedge_percentile: float | None = None,
+        http2: bool = False,
+        msgpack: bool = True,
     ):
         if agent_card:
             self.url = agent_card.url
@@ -42,45 +142,385 @@ class A2AClient:
         else:
             raise ValueError('Must provide either agent_card or url')
         self.timeout = timeout
+        self.limits = limits
+        self.max_stream_reconnects = max_stream_reconnects
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.hedge_percentile = hedge_percentile
+        self.http2 = http2
+        self.msgpack = msgpack and msgpack_available()
+        # Set once the server has answered in MessagePack.
+        self._server_msgpack = False
+        self.hedged_requests = 0
+        # Recent tasks/get latencies in seconds, for the hedging threshold.
+        self._get_latencies: deque[float] = deque(maxlen=256)
+        self._http_client = http_client
+        self._owns_http_client = http_client is None
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        if self._http_client is None:
+            self._http_client = new_http_client(
+                self.url,
+                http2=self.http2,
+                timeout=self.timeout,
+                limits=self.limits,
+            )
+        return self._http_client
+
+    async def aclose(self):
+        if self._owns_http_client and self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    async def __aenter__(self) -> 'A2AClient':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
 
     async def send_task(self, payload: dict[str, Any]) -> SendTaskResponse:
         request = SendTaskRequest(params=payload)
-        return SendTaskResponse(**await self._send_request(request))
+        try:
+            return SendTaskResponse(**await self._send_request(request))
+        except asyncio.CancelledError:
+            self._cancel_remote_task(request.params.id)
+            raise
 
     async def send_task_streaming(
         self, payload: dict[str, Any]
     ) -> AsyncIterable[SendTaskStreamingResponse]:
+        """Streams the task's events until a final status update.
+
+        If the connection drops after the first event, the stream resumes
+        with tasks/resubscribe from the sequence number (event metadata
+        'sequence') of the last event received, up to max_stream_reconnects
+        times in a row.
+        """
         request = SendTaskStreamingRequest(params=payload)
-        with httpx.Client(timeout=None) as client:
-            with connect_sse(
-                client, 'POST', self.url, json=request.model_dump()
-            ) as event_source:
+        task_id = request.params.id
+        last_sequence = None
+        reconnects = 0
+        try:
+            while True:
                 try:
-                    for sse in event_source.iter_sse():
-                        yield SendTaskStreamingResponse(**json.loads(sse.data))
-                except json.JSONDecodeError as e:
-                    raise A2AClientJSONError(str(e)) from e
-                except httpx.RequestError as e:
-                    raise A2AClientHTTPError(400, str(e)) from e
-
-    async def _send_request(self, request: JSONRPCRequest) -> dict[str, Any]:
-        async with httpx.AsyncClient() as client:
-            try:
-                # Image generation could take time, adding timeout
-                response = await client.post(
-                    self.url, json=request.model_dump(), timeout=self.timeout
+                    async for response in self._stream(request):
+                        reconnects = 0
+                        event = response.result
+                        if event is not None and event.metadata:
+                            last_sequence = event.metadata.get(
+                                'sequence', last_sequence
+                            )
+                        yield response
+                        if response.error is not None or (
+                            isinstance(event, TaskStatusUpdateEvent)
+                            and event.final
+                        ):
+                            return
+                    error = 'stream closed before the final event'
+                except httpx.TransportError as e:
+                    if isinstance(request, SendTaskStreamingRequest) and (
+                        last_sequence is None
+                    ):
+                        raise A2AClientHTTPError(400, str(e)) from e
+                    error = str(e)
+
+                if reconnects == self.max_stream_reconnects:
+                    raise A2AClientHTTPError(400, error)
+                logger.info(f'Resubscribing to task {task_id}: {error}')
+                await asyncio.sleep(min(0.1 * 2**reconnects, 2.0))
+                reconnects += 1
+                request = TaskResubscriptionRequest(
+                    params={'id': task_id, 'lastSequence': last_sequence}
                 )
-                response.raise_for_status()
-                return response.json()
+        except asyncio.CancelledError:
+            self._cancel_remote_task(task_id)
+            raise
+
+    async def _stream(
+        self, request: SendTaskStreamingRequest | TaskResubscriptionRequest
+    ) -> AsyncIterable[SendTaskStreamingResponse]:
+        async with aconnect_sse(
+            self.http_client,
+            'POST',
+            self.url,
+            json=request.model_dump(),
+            timeout=STREAM_TIMEOUT,
+        ) as event_source:
+            response = event_source.response
+            try:
+                if not response.headers.get('content-type', '').startswith(
+                    'text/event-stream'
+                ):
+                    # Errors (e.g. an unknown task) come back as plain JSON.
+                    response.raise_for_status()
+                    yield SendTaskStreamingResponse(
+                        **json.loads(await response.aread())
+                    )
+                    return
+
+                async for sse in event_source.aiter_sse():
+                    yield SendTaskStreamingResponse(**json.loads(sse.data))
             except httpx.HTTPStatusError as e:
                 raise A2AClientHTTPError(e.response.status_code, str(e)) from e
             except json.JSONDecodeError as e:
                 raise A2AClientJSONError(str(e)) from e
 
+    def _cancel_remote_task(self, task_id: str):
+        """Asks the remote agent to stop a task whose caller was cancelled.
+
+        Runs in the background so the local cancellation is not delayed.
+        """
+
+        async def cancel():
+            try:
+                await self.cancel_task({'id': task_id})
+            except Exception as e:
+                logger.warning(f'Could not cancel remote task {task_id}: {e}')
+
+        task = asyncio.create_task(cancel())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    async def send_many(
+        self,
+        payloads: Iterable[dict[str, Any]] | AsyncIterable[dict[str, Any]],
+        concurrency: int = 16,
+        stop_on_error: bool = False,
+    ) -> AsyncIterator[tuple[dict[str, Any], SendTaskResponse | Exception]]:
+        """Sends a task for every payload, at most concurrency at a time.
+
+        Payloads are read lazily, so the input may be a large or unbounded
+        (async) iterable. Yields (payload, response) pairs as the tasks
+        complete. A call that raises is yielded as (payload, exception),
+        unless stop_on_error is set: then the tasks still in flight are
+        cancelled (which cancels them on the agent too) and the exception
+        is raised.
+        """
+        async for _, payload, result in self._send_many(
+            _aenumerate(payloads), concurrency, stop_on_error
+        ):
+            yield payload, result
+
+    async def map_tasks(
+        self,
+        payloads: Iterable[dict[str, Any]] | AsyncIterable[dict[str, Any]],
+        concurrency: int = 16,
+        stop_on_error: bool = False,
+    ) -> list[SendTaskResponse | Exception]:
+        """Like send_many, but returns the results in the order of payloads."""
+        results = {}
+        async for index, _, result in self._send_many(
+            _aenumerate(payloads), concurrency, stop_on_error
+        ):
+            results[index] = result
+        return [results[index] for index in range(len(results))]
+
+    async def _send_many(
+        self,
+        payloads: AsyncIterator[tuple[int, dict[str, Any]]],
+        concurrency: int,
+        stop_on_error: bool,
+    ) -> AsyncIterator[
+        tuple[int, dict[str, Any], SendTaskResponse | Exception]
+    ]:
+        # task -> (index, payload)
+        in_flight: dict[asyncio.Task, tuple[int, dict[str, Any]]] = {}
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(in_flight) < concurrency:
+                    try:
+                        item = await anext(payloads)
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    task = asyncio.create_task(self.send_task(item[1]))
+                    in_flight[task] = item
+                if not in_flight:
+                    return
+
+                done, _ = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    index, payload = in_flight.pop(task)
+                    error = task.exception()
+                    if error is not None and stop_on_error:
+                        raise error
+                    yield index, payload, error or task.result()
+        finally:
+            for task in in_flight:
+                task.cancel()
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+
+    async def batch(
+        self, requests: list[JSONRPCRequest]
+    ) -> list[JSONRPCResponse]:
+        """Sends several non-streaming requests in one JSON-RPC batch.
+
+        Responses are matched by id and returned in the order of requests.
+        """
+        ids = [request.id for request in requests]
+        if len(set(ids)) != len(ids):
+            raise ValueError('Batched requests must have unique ids')
+
+        data = await self._send_request(requests)
+        if isinstance(data, dict):
+            # The server rejected the batch as a whole.
+            error = JSONRPCResponse(**data)
+            return [
+                error.model_copy(update={'id': request_id})
+                for request_id in ids
+            ]
+
+        responses_by_id = {item.get('id'): item for item in data}
+        responses = []
+        for request in requests:
+            response_type = RESPONSE_TYPES.get(type(request), JSONRPCResponse)
+            responses.append(response_type(**responses_by_id[request.id]))
+        return responses
+
+    async def _send_request(
+        self, request: JSONRPCRequest | list[JSONRPCRequest]
+    ) -> dict[str, Any] | list[dict[str, Any]]:
+        if isinstance(request, list) or (
+            request.method not in IDEMPOTENT_METHODS
+        ):
+            return await self._post(request, self.timeout)
+
+        deadline = None
+        if isinstance(self.timeout, int | float):
+            deadline = time.monotonic() + self.timeout
+        attempt = 0
+        while True:
+            timeout = self.timeout
+            if deadline is not None:
+                timeout = deadline - time.monotonic()
+            try:
+                if request.method == 'tasks/get' and self.hedge_percentile:
+                    return await self._post_hedged(request, timeout)
+                return await self._post(request, timeout)
+            except (A2AClientHTTPError, httpx.TransportError) as e:
+                if attempt == self.max_retries or not _is_retryable(e):
+                    raise
+                delay = random.uniform(0, self.retry_backoff * 2**attempt)
+                if deadline is not None and (
+                    time.monotonic() + delay >= deadline
+                ):
+                    raise
+                logger.info(f'Retrying {request.method} in {delay:.2f}s: {e}')
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _post(
+        self, request: JSONRPCRequest | list[JSONRPCRequest], timeout
+    ) -> dict[str, Any] | list[dict[str, Any]]:
+        # httpx applies timeout to each phase (connect, write, read, pool)
+        # separately; the deadline bounds the attempt as a whole.
+        deadline = timeout if isinstance(timeout, int | float) else None
+        try:
+            async with asyncio.timeout(deadline):
+                send_msgpack = self._server_msgpack
+                # Image generation could take time, adding timeout
+                response = await self.http_client.post(
+                    self.url,
+                    timeout=timeout,
+                    **self._encode(request, send_msgpack),
+                )
+                if response.status_code == 415 and send_msgpack:
+                    # The server stopped reading MessagePack; use JSON.
+                    self._server_msgpack = False
+                    response = await self.http_client.post(
+                        self.url,
+                        timeout=timeout,
+                        **self._encode(request, False),
+                    )
+                response.raise_for_status()
+                if self.msgpack and is_msgpack(
+                    response.headers.get('content-type')
+                ):
+                    self._server_msgpack = True
+                    return unpackb(response.content)
+                return response.json()
+        except httpx.HTTPStatusError as e:
+            raise A2AClientHTTPError(e.response.status_code, str(e)) from e
+        except (json.JSONDecodeError, MessagePackDecodeError) as e:
+            raise A2AClientJSONError(str(e)) from e
+
+    def _encode(
+        self, request: JSONRPCRequest | list[JSONRPCRequest], msgpack: bool
+    ) -> dict[str, Any]:
+        """Returns the httpx.post arguments carrying the request."""
+        dump = dump_binary if msgpack else JSONRPCRequest.model_dump
+        if isinstance(request, list):
+            payload = [dump(item) for item in request]
+        else:
+            payload = dump(request)
+
+        if msgpack:
+            return {
+                'content': packb(payload),
+                'headers': {
+                    'Content-Type': MSGPACK_MEDIA_TYPE,
+                    'Accept': MSGPACK_ACCEPT,
+                },
+            }
+        if self.msgpack:
+            return {'json': payload, 'headers': {'Accept': MSGPACK_ACCEPT}}
+        return {'json': payload}
+
+    async def _post_hedged(
+        self, request: JSONRPCRequest, timeout
+    ) -> dict[str, Any]:
+        start = time.monotonic()
+        threshold = self._hedge_threshold()
+        attempts = [asyncio.create_task(self._post(request, timeout))]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=threshold)
+            if not done:
+                if isinstance(timeout, int | float):
+                    timeout -= threshold
+                attempts.append(
+                    asyncio.create_task(self._post(request, timeout))
+                )
+                self.hedged_requests += 1
+
+            pending = set(attempts)
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for attempt in done:
+                    if attempt.exception() is None:
+                        self._get_latencies.append(time.monotonic() - start)
+                        return attempt.result()
+                if not pending:
+                    raise attempt.exception()
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    def _hedge_threshold(self) -> float | None:
+        """Latency percentile after which tasks/get is hedged, once enough
+        latencies have been seen.
+        """
+        if len(self._get_latencies) < 20:
+            return None
+        latencies = sorted(self._get_latencies)
+        return latencies[int(self.hedge_percentile * (len(latencies) - 1))]
+
     async def get_task(self, payload: dict[str, Any]) -> GetTaskResponse:
         request = GetTaskRequest(params=payload)
         return GetTaskResponse(**await self._send_request(request))
 
+    async def list_tasks(
+        self, payload: dict[str, Any] | None = None
+    ) -> ListTasksResponse:
+        request = ListTasksRequest(params=payload or {})
+        return ListTasksResponse(**await self._send_request(request))
+
     async def cancel_task(self, payload: dict[str, Any]) -> CancelTaskResponse:
         request = CancelTaskRequest(params=payload)
         return CancelTaskResponse(**await self._send_request(request))
@@ -99,4 +539,24 @@ class A2AClient:
         request = GetTaskPushNotificationRequest(params=payload)
         return GetTaskPushNotificationResponse(
             **await self._send_request(request)
-        )
\ No newline at end of file
+        )
+
+
+async def _aenumerate(
+    items: Iterable[Any] | AsyncIterable[Any],
+) -> AsyncIterator[tuple[int, Any]]:
+    index = 0
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            yield index, item
+            index += 1
+    else:
+        for item in items:
+            yield index, item
+            index += 1
+
+
+def _is_retryable(e: Exception) -> bool:
+    if isinstance(e, A2AClientHTTPError):
+        return e.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(e, httpx.TransportError)
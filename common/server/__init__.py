@@ -1,5 +1,22 @@
 from .server import A2AServer
+from .subscriber_queue import OverflowPolicy, SubscriberQueue
 from .task_manager import InMemoryTaskManager, TaskManager
+from .task_store import (
+    InMemoryTaskStore,
+    MessageHistory,
+    SQLiteTaskStore,
+    TaskStore,
+)
 
 
-__all__ = ['A2AServer', 'InMemoryTaskManager', 'TaskManager']
\ No newline at end of file
+__all__ = [
+    'A2AServer',
+    'InMemoryTaskManager',
+    'InMemoryTaskStore',
+    'MessageHistory',
+    'OverflowPolicy',
+    'SQLiteTaskStore',
+    'SubscriberQueue',
+    'TaskManager',
+    'TaskStore',
+]
\ No newline at end of file
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+
+from collections import OrderedDict, deque
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Job:
+    __slots__ = ('future', 'priority', 'session_id', 'task_id', 'work')
+
+    def __init__(
+        self,
+        task_id: str,
+        session_id: str | None,
+        priority: int,
+        work: Callable[[], Awaitable[Any]],
+    ):
+        self.task_id = task_id
+        self.session_id = session_id
+        self.priority = priority
+        self.work = work
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class TaskExecutionEngine:
+    """Runs submitted work on a bounded pool of async workers.
+
+    Pending jobs are grouped by priority and then by session. Workers always
+    serve the highest priority first and take turns between the sessions of
+    that priority, so a session submitting many tasks cannot starve the
+    others. Each job runs in its own asyncio task, started lazily on the
+    first submit.
+    """
+
+    def __init__(self, num_workers: int = 8, max_pending: int | None = None):
+        self.num_workers = num_workers
+        self.max_pending = max_pending
+        # priority -> session id -> jobs, sessions in round-robin order
+        self._pending: dict[int, OrderedDict[str | None, deque[_Job]]] = {}
+        self._pending_count = 0
+        self._condition = asyncio.Condition()
+        self._workers: list[asyncio.Task] = []
+        self.running: dict[str, asyncio.Task] = {}
+
+    @property
+    def pending_count(self) -> int:
+        return self._pending_count
+
+    def active_task_ids(self) -> set[str]:
+        """Returns the ids of the tasks with a pending or running job."""
+        task_ids = set(self.running)
+        for sessions in self._pending.values():
+            for jobs in sessions.values():
+                task_ids.update(job.task_id for job in jobs)
+        return task_ids
+
+    async def submit(
+        self,
+        task_id: str,
+        work: Callable[[], Awaitable[Any]],
+        session_id: str | None = None,
+        priority: int = 0,
+    ) -> asyncio.Future:
+        """Queues work and returns a future for its result.
+
+        Higher priorities run first. Raises asyncio.QueueFull when
+        max_pending jobs are already waiting.
+        """
+        if self.max_pending is not None and (
+            self._pending_count >= self.max_pending
+        ):
+            raise asyncio.QueueFull(f'{self._pending_count} tasks pending')
+
+        self._start_workers()
+        job = _Job(task_id, session_id, priority, work)
+        async with self._condition:
+            sessions = self._pending.setdefault(priority, OrderedDict())
+            sessions.setdefault(session_id, deque()).append(job)
+            self._pending_count += 1
+            self._condition.notify()
+        return job.future
+
+    async def cancel(self, task_id: str, timeout: float = 5.0) -> bool:
+        """Cancels the job of the task, pending or running.
+
+        A running job is given up to timeout seconds to unwind. Returns
+        False if the engine has no job for the task.
+        """
+        task = self.running.get(task_id)
+        if task is None:
+            return self._cancel_pending(task_id)
+
+        task.cancel()
+        await asyncio.wait([task], timeout=timeout)
+        return True
+
+    def _cancel_pending(self, task_id: str) -> bool:
+        for priority, sessions in self._pending.items():
+            for session_id, jobs in sessions.items():
+                for job in jobs:
+                    if job.task_id != task_id:
+                        continue
+                    jobs.remove(job)
+                    if not jobs:
+                        del sessions[session_id]
+                        if not sessions:
+                            del self._pending[priority]
+                    self._pending_count -= 1
+                    job.future.cancel()
+                    return True
+        return False
+
+    async def stop(self):
+        """Cancels the workers and everything still running or pending."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        for sessions in self._pending.values():
+            for jobs in sessions.values():
+                for job in jobs:
+                    job.future.cancel()
+        self._pending.clear()
+        self._pending_count = 0
+
+    def _start_workers(self):
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(self.num_workers)
+        ]
+
+    def _next_job(self) -> _Job:
+        priority = max(self._pending)
+        sessions = self._pending[priority]
+        session_id, jobs = next(iter(sessions.items()))
+        job = jobs.popleft()
+        if jobs:
+            sessions.move_to_end(session_id)
+        else:
+            del sessions[session_id]
+            if not sessions:
+                del self._pending[priority]
+        self._pending_count -= 1
+        return job
+
+    async def _worker(self):
+        while True:
+            async with self._condition:
+                await self._condition.wait_for(lambda: self._pending_count)
+                job = self._next_job()
+
+            if job.future.cancelled():
+                continue
+            await self._run(job)
+
+    async def _run(self, job: _Job):
+        task = asyncio.create_task(job.work())
+        self.running[job.task_id] = task
+        try:
+            # shield() keeps a cancelled job from cancelling its worker.
+            result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                # The worker itself is being stopped.
+                task.cancel()
+                raise
+            job.future.cancel()
+        except Exception as e:
+            logger.error(f'Task {job.task_id} failed: {e}')
+            if not job.future.done():
+                job.future.set_exception(e)
+                # Already logged; callers need not await the future.
+                job.future.exception()
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            if self.running.get(job.task_id) is task:
+                del self.running[job.task_id]
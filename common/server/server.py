@@ -1,35 +1,133 @@
+import asyncio
+import hashlib
 import json
 import logging
 
-from collections.abc import AsyncIterable
+from collections.abc import AsyncIterable, AsyncIterator
+from contextlib import asynccontextmanager
 from typing import Any
 
-from pydantic import ValidationError
+from pydantic import BaseModel, ValidationError
 from sse_starlette.sse import EventSourceResponse
 from starlette.applications import Starlette
 from starlette.requests import Request
-from starlette.responses import JSONResponse
+from starlette.responses import Response
 
 from common.server.task_manager import TaskManager
+from common.server.task_store import MessageHistory
 from common.types import (
     A2ARequest,
     AgentCard,
-    CancelTaskRequest,
-    GetTaskPushNotificationRequest,
-    GetTaskRequest,
     InternalError,
     InvalidRequestError,
     JSONParseError,
     JSONRPCResponse,
-    SendTaskRequest,
-    SendTaskStreamingRequest,
-    SetTaskPushNotificationRequest,
-    TaskResubscriptionRequest,
+    Task,
+)
+from common.utils.wire_format import (
+    MSGPACK_MEDIA_TYPE,
+    MessagePackDecodeError,
+    accepts_msgpack,
+    dump_binary,
+    is_msgpack,
+    msgpack_available,
+    packb,
+    unpackb,
 )
 
 
 logger = logging.getLogger(__name__)
 
+# JSON-RPC method name -> TaskManager handler. Every method accepted by the
+# A2ARequest discriminator must have an entry here.
+METHOD_HANDLERS: dict[str, str] = {
+    'tasks/get': 'on_get_task',
+    'tasks/send': 'on_send_task',
+    'tasks/sendSubscribe': 'on_send_task_subscribe',
+    'tasks/cancel': 'on_cancel_task',
+    'tasks/pushNotification/set': 'on_set_task_push_notification',
+    'tasks/pushNotification/get': 'on_get_task_push_notification',
+    'tasks/resubscribe': 'on_resubscribe_to_task',
+    'tasks/list': 'on_list_tasks',
+}
+
+# Methods answered with an SSE stream; they cannot be part of a batch.
+STREAMING_METHODS = frozenset({'tasks/sendSubscribe', 'tasks/resubscribe'})
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return any(
+        tag == '*' or tag.removeprefix('W/') == etag for tag in candidates
+    )
+
+
+def _is_json_invalid(e: Exception) -> bool:
+    """validate_json reports malformed JSON as a ValidationError."""
+    return isinstance(e, ValidationError) and any(
+        error['type'] == 'json_invalid' for error in e.errors()
+    )
+
+
+class PydanticJSONResponse(Response):
+    """Renders a pydantic model straight to JSON bytes.
+
+    Skips the intermediate dict that model_dump + JSONResponse would build.
+    """
+
+    media_type = 'application/json'
+
+    def render(self, content: BaseModel | list[BaseModel]) -> bytes:
+        if isinstance(content, list):
+            return b'[' + b','.join(map(self._render_model, content)) + b']'
+        return self._render_model(content)
+
+    @classmethod
+    def _render_model(cls, content: BaseModel) -> bytes:
+        result = getattr(content, 'result', None)
+        if isinstance(result, Task) and isinstance(
+            result.history, MessageHistory
+        ):
+            return cls._render_task_response(content, result)
+        return content.__pydantic_serializer__.to_json(
+            content, exclude_none=True
+        )
+
+    @staticmethod
+    def _render_task_response(content: BaseModel, task: Task) -> bytes:
+        """Splices the memoized JSON of the history into the response."""
+        envelope = content.__pydantic_serializer__.to_json(
+            content, exclude={'result'}, exclude_none=True
+        )
+        task_json = task.__pydantic_serializer__.to_json(
+            task, exclude={'history'}, exclude_none=True
+        )
+        return b''.join(
+            (
+                envelope[:-1],
+                b',"result":',
+                task_json[:-1],
+                b',"history":',
+                task.history.to_json(),
+                b'}}',
+            )
+        )
+
+
+class MessagePackResponse(Response):
+    """Renders a pydantic model as MessagePack, file content as raw bytes."""
+
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: BaseModel | list[BaseModel]) -> bytes:
+        if isinstance(content, list):
+            return packb(
+                [dump_binary(item, exclude_none=True) for item in content]
+            )
+        return packb(dump_binary(content, exclude_none=True))
+
 
 class A2AServer:
     def __init__(
@@ -39,13 +137,17 @@ class A2AServer:
         endpoint='/',
         agent_card: AgentCard = None,
         task_manager: TaskManager = None,
+        batch_concurrency: int = 16,
+        agent_card_max_age: int = 300,
     ):
         self.host = host
         self.port = port
         self.endpoint = endpoint
         self.task_manager = task_manager
+        self.batch_concurrency = batch_concurrency
+        self.agent_card_max_age = agent_card_max_age
         self.agent_card = agent_card
-        self.app = Starlette()
+        self.app = Starlette(lifespan=self._lifespan)
         self.app.add_route(
             self.endpoint, self._process_request, methods=['POST']
         )
@@ -53,62 +155,202 @@ class A2AServer:
             '/.well-known/agent.json', self._get_agent_card, methods=['GET']
         )
 
-    def start(self):
+    @asynccontextmanager
+    async def _lifespan(self, _app: Starlette) -> AsyncIterator[None]:
+        try:
+            yield
+        finally:
+            # Lets the task manager finish queued work and store writes.
+            if self.task_manager is not None:
+                await self.task_manager.close()
+
+    @property
+    def agent_card(self) -> AgentCard | None:
+        return self._agent_card
+
+    @agent_card.setter
+    def agent_card(self, agent_card: AgentCard | None):
+        """Serializes the card once; GETs then serve the cached bytes."""
+        self._agent_card = agent_card
+        if agent_card is None:
+            self._agent_card_body = None
+            self._agent_card_etag = None
+            return
+
+        self._agent_card_body = PydanticJSONResponse._render_model(agent_card)
+        digest = hashlib.sha256(self._agent_card_body).hexdigest()
+        self._agent_card_etag = f'"{digest[:32]}"'
+
+    def start(
+        self,
+        http2: bool = False,
+        certfile: str | None = None,
+        keyfile: str | None = None,
+    ):
+        """Serves the app with uvicorn, or with Hypercorn when http2 is set.
+
+        uvicorn only speaks HTTP/1.1. Hypercorn also serves HTTP/2: over TLS
+        (certfile and keyfile) clients negotiate it through ALPN, and in
+        cleartext it accepts h2c with prior knowledge, which is what
+        A2AClient(http2=True) sends to http:// URLs.
+        """
         if self.agent_card is None:
             raise ValueError('agent_card is not defined')
 
         if self.task_manager is None:
             raise ValueError('request_handler is not defined')
 
-        import uvicorn
+        if not http2:
+            import uvicorn
 
-        uvicorn.run(self.app, host=self.host, port=self.port)
+            uvicorn.run(
+                self.app,
+                host=self.host,
+                port=self.port,
+                ssl_certfile=certfile,
+                ssl_keyfile=keyfile,
+            )
+            return
 
-    def _get_agent_card(self, request: Request) -> JSONResponse:
-        return JSONResponse(self.agent_card.model_dump(exclude_none=True))
+        from hypercorn.asyncio import serve
+        from hypercorn.config import Config
+
+        config = Config()
+        config.bind = [f'{self.host}:{self.port}']
+        config.certfile = certfile
+        config.keyfile = keyfile
+        asyncio.run(serve(self.app, config))
+
+    def _get_agent_card(self, request: Request) -> Response:
+        if self._agent_card_body is None:
+            return Response(status_code=404)
+
+        headers = {
+            'ETag': self._agent_card_etag,
+            'Cache-Control': f'public, max-age={self.agent_card_max_age}',
+        }
+        if _etag_matches(
+            request.headers.get('if-none-match'), self._agent_card_etag
+        ):
+            return Response(status_code=304, headers=headers)
+
+        return Response(
+            self._agent_card_body,
+            media_type='application/json',
+            headers=headers,
+        )
 
     async def _process_request(self, request: Request):
+        # MessagePack is used only with clients that ask for it; everyone
+        # else gets JSON.
+        response_class = (
+            MessagePackResponse
+            if accepts_msgpack(request.headers.get('accept'))
+            else PydanticJSONResponse
+        )
         try:
-            body = await request.json()
-            json_rpc_request = A2ARequest.validate_python(body)
-
-            if isinstance(json_rpc_request, GetTaskRequest):
-                result = await self.task_manager.on_get_task(json_rpc_request)
-            elif isinstance(json_rpc_request, SendTaskRequest):
-                result = await self.task_manager.on_send_task(json_rpc_request)
-            elif isinstance(json_rpc_request, SendTaskStreamingRequest):
-                result = await self.task_manager.on_send_task_subscribe(
-                    json_rpc_request
-                )
-            elif isinstance(json_rpc_request, CancelTaskRequest):
-                result = await self.task_manager.on_cancel_task(
-                    json_rpc_request
-                )
-            elif isinstance(json_rpc_request, SetTaskPushNotificationRequest):
-                result = await self.task_manager.on_set_task_push_notification(
-                    json_rpc_request
-                )
-            elif isinstance(json_rpc_request, GetTaskPushNotificationRequest):
-                result = await self.task_manager.on_get_task_push_notification(
-                    json_rpc_request
-                )
-            elif isinstance(json_rpc_request, TaskResubscriptionRequest):
-                result = await self.task_manager.on_resubscribe_to_task(
-                    json_rpc_request
-                )
+            body = await request.body()
+            if is_msgpack(request.headers.get('content-type')):
+                if not msgpack_available():
+                    return self._unsupported_media_type()
+                data = unpackb(body)
+                if isinstance(data, list):
+                    return await self._process_batch(data, response_class)
+                json_rpc_request = A2ARequest.validate_python(data)
             else:
-                logger.warning(
-                    f'Unexpected request type: {type(json_rpc_request)}'
-                )
-                raise ValueError(f'Unexpected request type: {type(request)}')
+                if body.lstrip()[:1] == b'[':
+                    return await self._process_batch(
+                        json.loads(body), response_class
+                    )
+                json_rpc_request = A2ARequest.validate_json(body)
 
-            return self._create_response(result)
+            handler = getattr(
+                self.task_manager, METHOD_HANDLERS[json_rpc_request.method]
+            )
+            result = await handler(json_rpc_request)
+            return self._create_response(result, response_class)
 
         except Exception as e:
             return self._handle_exception(e)
 
-    def _handle_exception(self, e: Exception) -> JSONResponse:
-        if isinstance(e, json.decoder.JSONDecodeError):
+    def _unsupported_media_type(self) -> PydanticJSONResponse:
+        """Tells the client to fall back to JSON (msgpack is not installed)."""
+        response = JSONRPCResponse(
+            id=None,
+            error=InvalidRequestError(
+                message=f'Unsupported content type {MSGPACK_MEDIA_TYPE}'
+            ),
+        )
+        return PydanticJSONResponse(
+            response,
+            status_code=415,
+            headers={'Accept': 'application/json'},
+        )
+
+    async def _process_batch(
+        self,
+        items: list[Any],
+        response_class: type[Response] = PydanticJSONResponse,
+    ) -> Response:
+        """Runs a JSON-RPC batch concurrently, capped at batch_concurrency.
+
+        Responses are returned in the same order as the batch entries.
+        Notifications (entries without an id) are run but not answered; a
+        batch of notifications only gets an empty 204 response.
+        """
+        if not items:
+            response = JSONRPCResponse(
+                id=None,
+                error=InvalidRequestError(message='Batch request is empty'),
+            )
+            return response_class(response, status_code=400)
+
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+
+        async def run(item: Any) -> JSONRPCResponse | None:
+            async with semaphore:
+                response = await self._process_batch_item(item)
+            # Checked on the raw item, as JSONRPCRequest.id has a default.
+            is_notification = isinstance(item, dict) and 'id' not in item
+            return None if is_notification else response
+
+        responses = await asyncio.gather(*(run(item) for item in items))
+        responses = [r for r in responses if r is not None]
+        if not responses:
+            return Response(status_code=204)
+        return response_class(responses)
+
+    async def _process_batch_item(self, item: Any) -> JSONRPCResponse:
+        request_id = item.get('id') if isinstance(item, dict) else None
+        if not isinstance(request_id, int | str):
+            request_id = None
+
+        try:
+            json_rpc_request = A2ARequest.validate_python(item)
+            if json_rpc_request.method in STREAMING_METHODS:
+                return JSONRPCResponse(
+                    id=json_rpc_request.id,
+                    error=InvalidRequestError(
+                        message='Streaming methods cannot be batched'
+                    ),
+                )
+
+            handler = getattr(
+                self.task_manager, METHOD_HANDLERS[json_rpc_request.method]
+            )
+            return await handler(json_rpc_request)
+        except Exception as e:
+            return self._error_response(e, request_id)
+
+    def _handle_exception(self, e: Exception) -> PydanticJSONResponse:
+        return PydanticJSONResponse(self._error_response(e), status_code=400)
+
+    def _error_response(
+        self, e: Exception, request_id: int | str | None = None
+    ) -> JSONRPCResponse:
+        if isinstance(
+            e, json.decoder.JSONDecodeError | MessagePackDecodeError
+        ) or _is_json_invalid(e):
             json_rpc_error = JSONParseError()
         elif isinstance(e, ValidationError):
             json_rpc_error = InvalidRequestError(data=json.loads(e.json()))
@@ -116,15 +358,15 @@ class A2AServer:
             logger.error(f'Unhandled exception: {e}')
             json_rpc_error = InternalError()
 
-        response = JSONRPCResponse(id=None, error=json_rpc_error)
-        return JSONResponse(
-            response.model_dump(exclude_none=True), status_code=400
-        )
+        return JSONRPCResponse(id=request_id, error=json_rpc_error)
 
     def _create_response(
-        self, result: Any
-    ) -> JSONResponse | EventSourceResponse:
+        self,
+        result: Any,
+        response_class: type[Response] = PydanticJSONResponse,
+    ) -> Response:
         if isinstance(result, AsyncIterable):
+            # SSE is a text protocol, so streamed events stay JSON.
 
             async def event_generator(result) -> AsyncIterable[dict[str, str]]:
                 async for item in result:
@@ -132,6 +374,6 @@ class A2AServer:
 
             return EventSourceResponse(event_generator(result))
         if isinstance(result, JSONRPCResponse):
-            return JSONResponse(result.model_dump(exclude_none=True))
+            return response_class(result)
         logger.error(f'Unexpected result type: {type(result)}')
         raise ValueError(f'Unexpected result type: {type(result)}')
\ No newline at end of file
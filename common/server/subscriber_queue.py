@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+from enum import Enum
+from typing import Any
+
+from common.types import (
+    InternalError,
+    JSONRPCError,
+    TaskStatusUpdateEvent,
+)
+
+
+class OverflowPolicy(str, Enum):
+    # Discard the oldest queued event to make room.
+    DROP_OLDEST = 'drop_oldest'
+    # When a status update arrives, discard the oldest queued non-final
+    # status update it supersedes; otherwise behave like DROP_OLDEST.
+    MERGE_STATUS = 'merge_status'
+    # Drop everything queued and end the subscriber's stream with an error.
+    DISCONNECT = 'disconnect'
+
+
+class SubscriberQueue(asyncio.Queue):
+    """Bounded queue feeding one SSE subscriber.
+
+    Producers call offer(), which never blocks: when the queue is full the
+    overflow policy decides what is given up. Dropped events leave a gap in
+    the event sequence numbers, which the client can fill with
+    tasks/resubscribe. The counters describe how far the subscriber lags.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        overflow_policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+    ):
+        super().__init__(maxsize=maxsize)
+        self.overflow_policy = overflow_policy
+        self.disconnected = False
+        self.delivered = 0
+        self.dropped = 0
+        self.merged = 0
+        self.max_depth = 0
+        self.last_lag = 0.0
+
+    def _put(self, item: Any):
+        self._queue.append((time.monotonic(), item))
+        self.max_depth = max(self.max_depth, len(self._queue))
+
+    def _get(self) -> Any:
+        enqueued_at, item = self._queue.popleft()
+        self.delivered += 1
+        self.last_lag = time.monotonic() - enqueued_at
+        return item
+
+    def offer(self, event: Any) -> bool:
+        """Enqueues the event without blocking.
+
+        Returns False if the subscriber is (or just got) disconnected.
+        """
+        if self.disconnected:
+            return False
+
+        if self.full():
+            if self.overflow_policy == OverflowPolicy.DISCONNECT:
+                self.disconnect(
+                    InternalError(message='SSE subscriber is too slow')
+                )
+                return False
+            merge = self.overflow_policy == OverflowPolicy.MERGE_STATUS and (
+                isinstance(event, TaskStatusUpdateEvent)
+            )
+            if not (merge and self._drop_superseded_status()):
+                self._queue.popleft()
+                self.dropped += 1
+
+        self.put_nowait(event)
+        return True
+
+    def disconnect(self, error: JSONRPCError):
+        """Discards queued events and ends the stream with the error."""
+        self.disconnected = True
+        self._queue.clear()
+        self.put_nowait(error)
+
+    def metrics(self) -> dict[str, Any]:
+        if self._queue:
+            oldest_age = time.monotonic() - self._queue[0][0]
+        else:
+            oldest_age = 0.0
+        return {
+            'depth': len(self._queue),
+            'max_depth': self.max_depth,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'merged': self.merged,
+            'last_lag_seconds': self.last_lag,
+            'oldest_event_age_seconds': oldest_age,
+            'disconnected': self.disconnected,
+        }
+
+    def _drop_superseded_status(self) -> bool:
+        for i, (_, item) in enumerate(self._queue):
+            if isinstance(item, TaskStatusUpdateEvent) and not item.final:
+                del self._queue[i]
+                self.merged += 1
+                return True
+        return False
@@ -1,9 +1,22 @@
 import asyncio
+import hashlib
 import logging
+import time
 
 from abc import ABC, abstractmethod
-from collections.abc import AsyncIterable
-
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterable, Awaitable, Callable
+from typing import Any
+
+from pydantic import BaseModel
+
+from common.server.execution_engine import TaskExecutionEngine
+from common.server.subscriber_queue import OverflowPolicy, SubscriberQueue
+from common.server.task_store import (
+    InMemoryTaskStore,
+    MessageHistory,
+    TaskStore,
+)
 from common.server.utils import new_not_implemented_error
 from common.types import (
     Artifact,
@@ -14,8 +27,13 @@ from common.types import (
     GetTaskRequest,
     GetTaskResponse,
     InternalError,
+    InvalidParamsError,
     JSONRPCError,
     JSONRPCResponse,
+    ListTasksRequest,
+    ListTasksResponse,
+    ListTasksResult,
+    Message,
     PushNotificationConfig,
     SendTaskRequest,
     SendTaskResponse,
@@ -24,21 +42,60 @@ from common.types import (
     SetTaskPushNotificationRequest,
     SetTaskPushNotificationResponse,
     Task,
+    TaskArtifactUpdateEvent,
     TaskIdParams,
     TaskNotCancelableError,
     TaskNotFoundError,
     TaskPushNotificationConfig,
     TaskQueryParams,
+    TaskResubscriptionParams,
     TaskResubscriptionRequest,
     TaskSendParams,
     TaskState,
     TaskStatus,
     TaskStatusUpdateEvent,
+    TextPart,
 )
 
 
 logger = logging.getLogger(__name__)
 
+# Agent work submitted to the execution engine; returns the final status and
+# artifacts of the task.
+TaskWork = Callable[[], Awaitable[tuple[TaskStatus, list[Artifact] | None]]]
+
+TERMINAL_STATES = frozenset(
+    {TaskState.COMPLETED, TaskState.FAILED, TaskState.CANCELED}
+)
+
+
+class _SendFlight:
+    """Tracks one submitted tasks/send for deduplication."""
+
+    __slots__ = ('finished_at', 'submitted')
+
+    def __init__(self):
+        self.submitted = asyncio.get_running_loop().create_future()
+        self.finished_at: float | None = None
+
+    def start(self, job: asyncio.Future):
+        """Marks the work as queued; the flight finishes with the job."""
+        self.submitted.set_result(True)
+        job.add_done_callback(self._finish)
+
+    def _finish(self, _job: asyncio.Future):
+        self.finished_at = time.monotonic()
+
+
+def _message_digest(message: Message) -> str:
+    return hashlib.sha256(
+        message.__pydantic_serializer__.to_json(message)
+    ).hexdigest()
+
+
+def _is_final_event(event: BaseModel) -> bool:
+    return isinstance(event, TaskStatusUpdateEvent) and event.final
+
 
 class TaskManager(ABC):
     @abstractmethod
@@ -79,44 +136,171 @@ class TaskManager(ABC):
     ) -> AsyncIterable[SendTaskResponse] | JSONRPCResponse:
         pass
 
+    async def on_list_tasks(
+        self, request: ListTasksRequest
+    ) -> ListTasksResponse:
+        return new_not_implemented_error(request.id)
+
+    async def close(self) -> None:
+        """Releases resources; A2AServer calls it on shutdown."""
+
 
 class InMemoryTaskManager(TaskManager):
-    def __init__(self):
-        self.tasks: dict[str, Task] = {}
+    """Keeps tasks in a TaskStore, in process memory unless another store
+    (e.g. SQLiteTaskStore) is given.
+
+    Retention is opt-in: terminal tasks are evicted task_ttl seconds after
+    they finish, and once more than max_tasks tasks (or roughly
+    max_task_bytes of history and artifacts) are held, the least recently
+    used tasks are evicted, terminal ones first. Tasks whose work is queued
+    or running are never evicted, so the caps can be exceeded until it
+    finishes. Limits are enforced whenever a task is inserted or finishes,
+    and by calling enforce_retention(). Retention and liveness are tracked
+    per process: when several workers share a SQLiteTaskStore, one worker
+    can delete a task another is still running, so leave retention off in
+    that setup (or enable it in a single worker only).
+
+    The last event_buffer_size SSE events of every task are kept, numbered
+    by a per-task sequence stored in the event metadata, so that
+    tasks/resubscribe can replay what a dropped client missed.
+
+    Each SSE subscriber gets a SubscriberQueue bounded to
+    subscriber_queue_size events; subscriber_overflow_policy decides what
+    happens when a slow subscriber falls that far behind.
+
+    Agents hand their work to submit_task/submit_task_subscribe, which run
+    it on execution_engine instead of inside the HTTP request. Sending the
+    same message to the same task again while it runs, or up to
+    dedup_window seconds after it finished, returns the existing task
+    instead of executing it twice. A finished send only counts as retried
+    while its message is still the task's last user message and the task
+    is not waiting for input; otherwise the message is a new turn.
+    """
+
+    def __init__(
+        self,
+        lock_stripes: int = 64,
+        task_ttl: float | None = None,
+        max_tasks: int | None = None,
+        max_task_bytes: int | None = None,
+        task_store: TaskStore | None = None,
+        event_buffer_size: int = 256,
+        subscriber_queue_size: int = 256,
+        subscriber_overflow_policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        execution_engine: TaskExecutionEngine | None = None,
+        dedup_window: float = 60.0,
+    ):
+        self.task_store = task_store or InMemoryTaskStore()
+        self.execution_engine = execution_engine or TaskExecutionEngine()
+        self.dedup_window = dedup_window
+        # task id -> message digest -> send of that message
+        self._send_flights: dict[str, dict[str, _SendFlight]] = {}
         self.push_notification_infos: dict[str, PushNotificationConfig] = {}
+        # self.lock only guards inserting and removing tasks; everything that
+        # reads or mutates a single task holds that task's stripe instead.
         self.lock = asyncio.Lock()
-        self.task_sse_subscribers: dict[str, list[asyncio.Queue]] = {}
+        self.task_locks = [asyncio.Lock() for _ in range(lock_stripes)]
+        self.task_sse_subscribers: dict[str, list[SubscriberQueue]] = {}
         self.subscriber_lock = asyncio.Lock()
+        self.subscriber_queue_size = subscriber_queue_size
+        self.subscriber_overflow_policy = subscriber_overflow_policy
+        self.event_buffer_size = event_buffer_size
+        # task id -> recent (sequence, event) pairs, guarded by subscriber_lock
+        self.task_event_buffers: dict[str, deque[tuple[int, BaseModel]]] = {}
+        self._task_event_sequences: dict[str, int] = {}
+        self.task_ttl = task_ttl
+        self.max_tasks = max_tasks
+        self.max_task_bytes = max_task_bytes
+        # task id -> approximate size in bytes, least recently used first.
+        self._task_sizes: OrderedDict[str, int] = OrderedDict()
+        self._total_task_bytes = 0
+        # task id -> time it reached a terminal state, oldest first.
+        self._terminal_since: dict[str, float] = {}
+
+    async def close(self) -> None:
+        """Cancels the work still queued or running, then closes the task
+        store, committing its queued writes.
+        """
+        await self.execution_engine.stop()
+        await self.task_store.close()
 
     async def on_get_task(self, request: GetTaskRequest) -> GetTaskResponse:
         logger.info(f'Getting task {request.params.id}')
         task_query_params: TaskQueryParams = request.params
 
-        async with self.lock:
-            task = self.tasks.get(task_query_params.id)
+        async with self.task_lock(task_query_params.id):
+            task = await self.task_store.get(task_query_params.id)
             if task is None:
                 return GetTaskResponse(id=request.id, error=TaskNotFoundError())
 
+            self._track_task(task.id)
             task_result = self.append_task_history(
                 task, task_query_params.historyLength
             )
 
         return GetTaskResponse(id=request.id, result=task_result)
 
+    async def on_list_tasks(
+        self, request: ListTasksRequest
+    ) -> ListTasksResponse:
+        params = request.params
+        try:
+            tasks, next_cursor = await self.task_store.list_tasks(
+                session_id=params.sessionId,
+                state=params.state,
+                cursor=params.cursor,
+                limit=params.limit,
+            )
+        except ValueError:
+            return ListTasksResponse(
+                id=request.id,
+                error=InvalidParamsError(message='Invalid cursor'),
+            )
+
+        tasks = [
+            self.append_task_history(task, params.historyLength)
+            for task in tasks
+        ]
+        return ListTasksResponse(
+            id=request.id,
+            result=ListTasksResult(tasks=tasks, nextCursor=next_cursor),
+        )
+
     async def on_cancel_task(
         self, request: CancelTaskRequest
     ) -> CancelTaskResponse:
         logger.info(f'Cancelling task {request.params.id}')
         task_id_params: TaskIdParams = request.params
 
-        async with self.lock:
-            task = self.tasks.get(task_id_params.id)
+        async with self.task_lock(task_id_params.id):
+            task = await self.task_store.get(task_id_params.id)
             if task is None:
                 return CancelTaskResponse(
                     id=request.id, error=TaskNotFoundError()
                 )
+            if task.status.state in TERMINAL_STATES:
+                return CancelTaskResponse(
+                    id=request.id, error=TaskNotCancelableError()
+                )
 
-        return CancelTaskResponse(id=request.id, error=TaskNotCancelableError())
+        # Cancelling the job also aborts the agent's in-flight LLM, tool and
+        # A2AClient calls; A2AClient forwards the cancel to remote agents.
+        await self.execution_engine.cancel(task_id_params.id)
+
+        async with self.task_lock(task_id_params.id):
+            task = await self.task_store.get(task_id_params.id)
+            if task is None or task.status.state in TERMINAL_STATES:
+                # The task finished or was evicted while being cancelled.
+                return CancelTaskResponse(
+                    id=request.id, error=TaskNotCancelableError()
+                )
+
+        task = await self.publish_task_update(
+            task_id_params.id, TaskStatus(state=TaskState.CANCELED)
+        )
+        return CancelTaskResponse(
+            id=request.id, result=self.append_task_history(task, None)
+        )
 
     @abstractmethod
     async def on_send_task(self, request: SendTaskRequest) -> SendTaskResponse:
@@ -128,11 +312,15 @@ class InMemoryTaskManager(TaskManager):
     ) -> AsyncIterable[SendTaskStreamingResponse] | JSONRPCResponse:
         pass
 
+    def task_lock(self, task_id: str) -> asyncio.Lock:
+        """Returns the lock stripe guarding the given task."""
+        return self.task_locks[hash(task_id) % len(self.task_locks)]
+
     async def set_push_notification_info(
         self, task_id: str, notification_config: PushNotificationConfig
     ):
-        async with self.lock:
-            task = self.tasks.get(task_id)
+        async with self.task_lock(task_id):
+            task = await self.task_store.get(task_id)
             if task is None:
                 raise ValueError(f'Task not found for {task_id}')
 
@@ -141,17 +329,15 @@ class InMemoryTaskManager(TaskManager):
     async def get_push_notification_info(
         self, task_id: str
     ) -> PushNotificationConfig:
-        async with self.lock:
-            task = self.tasks.get(task_id)
+        async with self.task_lock(task_id):
+            task = await self.task_store.get(task_id)
             if task is None:
                 raise ValueError(f'Task not found for {task_id}')
 
             return self.push_notification_infos[task_id]
 
-    
-
     async def has_push_notification_info(self, task_id: str) -> bool:
-        async with self.lock:
+        async with self.task_lock(task_id):
             return task_id in self.push_notification_infos
 
     async def on_set_task_push_notification(
@@ -206,8 +392,8 @@ class InMemoryTaskManager(TaskManager):
 
     async def upsert_task(self, task_send_params: TaskSendParams) -> Task:
         logger.info(f'Upserting task {task_send_params.id}')
-        async with self.lock:
-            task = self.tasks.get(task_send_params.id)
+        async with self.task_lock(task_send_params.id):
+            task = await self.task_store.get(task_send_params.id)
             if task is None:
                 task = Task(
                     id=task_send_params.id,
@@ -216,47 +402,412 @@ class InMemoryTaskManager(TaskManager):
                     status=TaskStatus(state=TaskState.SUBMITTED),
                     history=[task_send_params.message],
                 )
-                self.tasks[task_send_params.id] = task
+                async with self.lock:
+                    await self.task_store.create(task)
+                is_new_task = True
             else:
-                task.history.append(task_send_params.message)
+                task = await self.task_store.append_history(
+                    task.id, task_send_params.message
+                )
+                # A follow-up turn stops the TTL clock until it finishes.
+                self._terminal_since.pop(task.id, None)
+                is_new_task = False
+
+            self._track_task(task.id, task_send_params.message)
+
+        if is_new_task:
+            await self.enforce_retention()
+        return task
+
+    async def submit_task(
+        self,
+        request: SendTaskRequest,
+        work: TaskWork,
+        priority: int = 0,
+    ) -> SendTaskResponse:
+        """Stores the task, queues work on the execution engine and answers
+        right away with the task in SUBMITTED state.
+
+        The status and artifacts returned by work are published through
+        update_store and the SSE queues.
+        """
+        flight, is_duplicate = await self._claim_send_flight(request.params)
+        if is_duplicate:
+            response = await self.on_get_task(
+                GetTaskRequest(
+                    id=request.id,
+                    params=TaskQueryParams(
+                        id=request.params.id,
+                        historyLength=request.params.historyLength,
+                    ),
+                )
+            )
+            return SendTaskResponse(
+                id=request.id, result=response.result, error=response.error
+            )
+
+        try:
+            task = await self.upsert_task(request.params)
+            job = await self._submit(request.params, work, priority)
+        except asyncio.QueueFull:
+            self._release_send_flight(request.params, flight)
+            return SendTaskResponse(
+                id=request.id,
+                error=InternalError(message='Too many pending tasks'),
+            )
+        except BaseException:
+            self._release_send_flight(request.params, flight)
+            raise
+
+        flight.start(job)
+        task_result = self.append_task_history(
+            task, request.params.historyLength
+        )
+        return SendTaskResponse(id=request.id, result=task_result)
+
+    async def submit_task_subscribe(
+        self,
+        request: SendTaskStreamingRequest,
+        work: TaskWork,
+        priority: int = 0,
+    ) -> AsyncIterable[SendTaskStreamingResponse] | JSONRPCResponse:
+        """Like submit_task, but streams the task's events back over SSE."""
+        flight, is_duplicate = await self._claim_send_flight(request.params)
+        if is_duplicate:
+            # Attach the duplicate to the original stream from its start.
+            return await self.on_resubscribe_to_task(
+                TaskResubscriptionRequest(
+                    id=request.id,
+                    params=TaskResubscriptionParams(id=request.params.id),
+                )
+            )
+
+        sse_event_queue = None
+        try:
+            task = await self.upsert_task(request.params)
+            sse_event_queue = await self.setup_sse_consumer(task.id)
+            job = await self._submit(request.params, work, priority)
+        except BaseException as e:
+            self._release_send_flight(request.params, flight)
+            if sse_event_queue is not None:
+                await self._remove_sse_consumer(task.id, sse_event_queue)
+            if not isinstance(e, asyncio.QueueFull):
+                raise
+            return JSONRPCResponse(
+                id=request.id,
+                error=InternalError(message='Too many pending tasks'),
+            )
 
-            return task
+        flight.start(job)
+        return self.dequeue_events_for_sse(
+            request.id, task.id, sse_event_queue
+        )
+
+    async def _claim_send_flight(
+        self, task_send_params: TaskSendParams
+    ) -> tuple[_SendFlight, bool]:
+        """Returns the single flight of this task id and message, and
+        whether it was already claimed by an earlier send that is still
+        running or is retried within dedup_window seconds of finishing.
+
+        A duplicate is returned once the earlier send has queued its work.
+        If that send failed before queueing, the flight is claimed again.
+        """
+        task_id = task_send_params.id
+        digest = _message_digest(task_send_params.message)
+        while True:
+            flights = self._send_flights.setdefault(task_id, {})
+            flight = flights.get(digest)
+            if flight is None:
+                flight = flights[digest] = _SendFlight()
+                return flight, False
+
+            if flight.finished_at is None:
+                if await asyncio.shield(flight.submitted):
+                    logger.info(f'Deduplicated send for task {task_id}')
+                    return flight, True
+                continue
+
+            if time.monotonic() - flight.finished_at <= self.dedup_window:
+                is_retry = await self._is_send_retry(task_send_params, digest)
+                flights = self._send_flights.get(task_id, {})
+                if flights.get(digest) is not flight:
+                    # Claimed anew while the task was read.
+                    continue
+                if is_retry:
+                    logger.info(f'Deduplicated send for task {task_id}')
+                    return flight, True
+
+            flight = flights[digest] = _SendFlight()
+            return flight, False
+
+    async def _is_send_retry(
+        self, task_send_params: TaskSendParams, digest: str
+    ) -> bool:
+        """Whether a finished send of the message is being retried rather
+        than sent again as a new turn.
+        """
+        async with self.task_lock(task_send_params.id):
+            task = await self.task_store.get(task_send_params.id)
+        if task is None or task.status.state == TaskState.INPUT_REQUIRED:
+            return False
+        for message in reversed(task.history or []):
+            if message.role == 'user':
+                return _message_digest(message) == digest
+        return False
+
+    def _release_send_flight(
+        self, task_send_params: TaskSendParams, flight: _SendFlight
+    ):
+        """Forgets a send that failed before its work was queued."""
+        digest = _message_digest(task_send_params.message)
+        flights = self._send_flights.get(task_send_params.id, {})
+        if flights.get(digest) is flight:
+            del flights[digest]
+        flight.submitted.set_result(False)
+
+    async def _submit(
+        self,
+        task_send_params: TaskSendParams,
+        work: TaskWork,
+        priority: int,
+    ) -> asyncio.Future:
+        task_id = task_send_params.id
+
+        async def execute():
+            await self.publish_task_update(
+                task_id, TaskStatus(state=TaskState.WORKING)
+            )
+            try:
+                status, artifacts = await work()
+            except Exception as e:
+                logger.error(f'Error while executing task {task_id}: {e}')
+                message = Message(role='agent', parts=[TextPart(text=str(e))])
+                status = TaskStatus(state=TaskState.FAILED, message=message)
+                artifacts = None
+            await self.publish_task_update(task_id, status, artifacts)
+
+        return await self.execution_engine.submit(
+            task_id,
+            execute,
+            session_id=task_send_params.sessionId,
+            priority=priority,
+        )
+
+    async def publish_task_update(
+        self,
+        task_id: str,
+        status: TaskStatus,
+        artifacts: list[Artifact] | None = None,
+    ) -> Task:
+        """Stores the update and sends it to the task's SSE subscribers."""
+        task = await self.update_store(task_id, status, artifacts)
+        for artifact in artifacts or []:
+            await self.enqueue_events_for_sse(
+                task_id, TaskArtifactUpdateEvent(id=task_id, artifact=artifact)
+            )
+        await self.enqueue_events_for_sse(
+            task_id,
+            TaskStatusUpdateEvent(
+                id=task_id,
+                status=status,
+                final=status.state in TERMINAL_STATES
+                or status.state == TaskState.INPUT_REQUIRED,
+            ),
+        )
+        return task
 
     async def on_resubscribe_to_task(
         self, request: TaskResubscriptionRequest
     ) -> AsyncIterable[SendTaskStreamingResponse] | JSONRPCResponse:
-        return new_not_implemented_error(request.id)
+        task_id = request.params.id
+        last_sequence = request.params.lastSequence or 0
+        task = await self.task_store.get(task_id)
+        if task is None:
+            return JSONRPCResponse(id=request.id, error=TaskNotFoundError())
+
+        async with self.subscriber_lock:
+            buffered = self.task_event_buffers.get(task_id, ())
+            replay = [event for seq, event in buffered if seq > last_sequence]
+            is_final = task.status.state in TERMINAL_STATES
+            if not replay and buffered and _is_final_event(buffered[-1][1]):
+                # Nothing was missed but the stream is over; repeat its end.
+                replay.append(buffered[-1][1])
+            elif (
+                not buffered
+                or buffered[0][0] > last_sequence + 1
+                or (is_final and not replay)
+            ):
+                # Events were missed beyond what is buffered, or the task is
+                # already over: send the current status too. A final status
+                # ends the stream, so it goes after the buffered events.
+                snapshot = TaskStatusUpdateEvent(
+                    id=task_id, status=task.status, final=is_final
+                )
+                if not is_final:
+                    replay.insert(0, snapshot)
+                elif not (replay and _is_final_event(replay[-1])):
+                    replay.append(snapshot)
+
+            sse_event_queue = self._new_subscriber_queue()
+            self.task_sse_subscribers.setdefault(task_id, []).append(
+                sse_event_queue
+            )
+
+        return self._replay_events_for_sse(
+            request.id, task_id, replay, sse_event_queue
+        )
+
+    async def _replay_events_for_sse(
+        self,
+        request_id,
+        task_id,
+        replay: list[BaseModel],
+        sse_event_queue: SubscriberQueue,
+    ) -> AsyncIterable[SendTaskStreamingResponse]:
+        try:
+            for event in replay:
+                yield SendTaskStreamingResponse(id=request_id, result=event)
+                if _is_final_event(event):
+                    return
+
+            async for response in self.dequeue_events_for_sse(
+                request_id, task_id, sse_event_queue
+            ):
+                yield response
+        finally:
+            await self._remove_sse_consumer(task_id, sse_event_queue)
 
     async def update_store(
         self, task_id: str, status: TaskStatus, artifacts: list[Artifact]
     ) -> Task:
-        async with self.lock:
+        async with self.task_lock(task_id):
             try:
-                task = self.tasks[task_id]
+                task = await self.task_store.update(task_id, status, artifacts)
             except KeyError:
                 logger.error(f'Task {task_id} not found for updating the task')
                 raise ValueError(f'Task {task_id} not found')
 
-            task.status = status
+            self._track_task(task_id, status.message, *(artifacts or []))
+            self._terminal_since.pop(task_id, None)
+            if status.state in TERMINAL_STATES:
+                self._terminal_since[task_id] = time.monotonic()
+
+        if status.state in TERMINAL_STATES:
+            await self.enforce_retention()
+        return task
+
+    def _track_task(self, task_id: str, *added: BaseModel | None):
+        """Marks the task as recently used and accounts for added content."""
+        size = self._task_sizes.pop(task_id, 0)
+        if self.max_task_bytes is not None:
+            added_bytes = sum(
+                len(item.__pydantic_serializer__.to_json(item))
+                for item in added
+                if item is not None
+            )
+            size += added_bytes
+            self._total_task_bytes += added_bytes
+        self._task_sizes[task_id] = size
 
-            if status.message is not None:
-                task.history.append(status.message)
+    async def enforce_retention(self) -> list[str]:
+        """Evicts expired terminal tasks, then LRU tasks above the caps,
+        skipping tasks with live work.
 
-            if artifacts is not None:
-                if task.artifacts is None:
-                    task.artifacts = []
-                task.artifacts.extend(artifacts)
+        Returns the ids of the evicted tasks.
+        """
+        evicted = []
+        async with self.lock:
+            if self.task_ttl is not None:
+                deadline = time.monotonic() - self.task_ttl
+                expired = []
+                for task_id, finished_at in self._terminal_since.items():
+                    if finished_at > deadline:
+                        break
+                    expired.append(task_id)
+                live = self._live_task_ids() if expired else set()
+                for task_id in expired:
+                    if task_id not in live:
+                        await self._remove_task(task_id)
+                        evicted.append(task_id)
+
+            if self._over_capacity():
+                for task_id in self._eviction_candidates():
+                    if not self._over_capacity():
+                        break
+                    await self._remove_task(task_id)
+                    evicted.append(task_id)
+                else:
+                    if self._over_capacity():
+                        logger.info(
+                            'Task retention caps exceeded by tasks with '
+                            'live work'
+                        )
+
+        if evicted:
+            logger.info(f'Evicted {len(evicted)} tasks')
+            async with self.subscriber_lock:
+                for task_id in evicted:
+                    self.task_event_buffers.pop(task_id, None)
+                    self._task_event_sequences.pop(task_id, None)
+                    # Wake up any SSE consumer still waiting on the task.
+                    for subscriber in self.task_sse_subscribers.pop(
+                        task_id, []
+                    ):
+                        subscriber.disconnect(TaskNotFoundError())
+        return evicted
+
+    def _live_task_ids(self) -> set[str]:
+        """Tasks whose work is queued or running, or about to be queued."""
+        live = self.execution_engine.active_task_ids()
+        for task_id, flights in self._send_flights.items():
+            # A send between claiming its flight and queueing its work.
+            if any(f.finished_at is None for f in flights.values()):
+                live.add(task_id)
+        return live
+
+    def _eviction_candidates(self) -> list[str]:
+        """Tasks without live work, terminal ones first, each group least
+        recently used first.
+        """
+        live = self._live_task_ids()
+        terminal, idle = [], []
+        for task_id in self._task_sizes:
+            if task_id in live:
+                continue
+            if task_id in self._terminal_since:
+                terminal.append(task_id)
+            else:
+                idle.append(task_id)
+        return terminal + idle
+
+    def _over_capacity(self) -> bool:
+        if self.max_tasks is not None:
+            if len(self._task_sizes) > self.max_tasks:
+                return True
+        return (
+            self.max_task_bytes is not None
+            and self._total_task_bytes > self.max_task_bytes
+        )
 
-            return task
+    async def _remove_task(self, task_id: str):
+        await self.task_store.delete(task_id)
+        self._send_flights.pop(task_id, None)
+        self.push_notification_infos.pop(task_id, None)
+        self._terminal_since.pop(task_id, None)
+        self._total_task_bytes -= self._task_sizes.pop(task_id, 0)
 
     def append_task_history(self, task: Task, historyLength: int | None):
-        new_task = task.model_copy()
-        if historyLength is not None and historyLength > 0:
-            new_task.history = new_task.history[-historyLength:]
+        # A shallow copy; only the returned tail of the history is new.
+        history = task.history or []
+        if historyLength is None or historyLength <= 0:
+            history = []
+        elif isinstance(history, MessageHistory):
+            history = history.tail(historyLength)
         else:
-            new_task.history = []
+            history = history[-historyLength:]
 
-        return new_task
+        return task.model_copy(update={'history': history})
 
     async def setup_sse_consumer(
         self, task_id: str, is_resubscribe: bool = False
@@ -267,21 +818,47 @@ class InMemoryTaskManager(TaskManager):
                     raise ValueError('Task not found for resubscription')
                 self.task_sse_subscribers[task_id] = []
 
-            sse_event_queue = asyncio.Queue(maxsize=0)  # <=0 is unlimited
+            sse_event_queue = self._new_subscriber_queue()
             self.task_sse_subscribers[task_id].append(sse_event_queue)
             return sse_event_queue
 
+    def _new_subscriber_queue(self) -> SubscriberQueue:
+        return SubscriberQueue(
+            maxsize=self.subscriber_queue_size,
+            overflow_policy=self.subscriber_overflow_policy,
+        )
+
     async def enqueue_events_for_sse(self, task_id, task_update_event):
         async with self.subscriber_lock:
-            if task_id not in self.task_sse_subscribers:
-                return
+            if isinstance(
+                task_update_event,
+                TaskStatusUpdateEvent | TaskArtifactUpdateEvent,
+            ):
+                self._buffer_event(task_id, task_update_event)
+
+            current_subscribers = list(
+                self.task_sse_subscribers.get(task_id, ())
+            )
 
-            current_subscribers = self.task_sse_subscribers[task_id]
-            for subscriber in current_subscribers:
-                await subscriber.put(task_update_event)
+        # Fan out without holding the lock; offer() never blocks.
+        disconnected = [
+            subscriber
+            for subscriber in current_subscribers
+            if not subscriber.offer(task_update_event)
+        ]
+        for subscriber in disconnected:
+            logger.warning(f'Disconnected slow SSE subscriber of {task_id}')
+            await self._remove_sse_consumer(task_id, subscriber)
+
+    def get_subscriber_metrics(self) -> dict[str, list[dict[str, Any]]]:
+        """Returns queue depth and lag counters of every SSE subscriber."""
+        return {
+            task_id: [subscriber.metrics() for subscriber in subscribers]
+            for task_id, subscribers in self.task_sse_subscribers.items()
+        }
 
     async def dequeue_events_for_sse(
-        self, request_id, task_id, sse_event_queue: asyncio.Queue
+        self, request_id, task_id, sse_event_queue: SubscriberQueue
     ) -> AsyncIterable[SendTaskStreamingResponse] | JSONRPCResponse:
         try:
             while True:
@@ -294,6 +871,28 @@ class InMemoryTaskManager(TaskManager):
                 if isinstance(event, TaskStatusUpdateEvent) and event.final:
                     break
         finally:
-            async with self.subscriber_lock:
-                if task_id in self.task_sse_subscribers:
-                    self.task_sse_subscribers[task_id].remove(sse_event_queue)
\ No newline at end of file
+            await self._remove_sse_consumer(task_id, sse_event_queue)
+
+    async def _remove_sse_consumer(
+        self, task_id, sse_event_queue: SubscriberQueue
+    ):
+        async with self.subscriber_lock:
+            subscribers = self.task_sse_subscribers.get(task_id, [])
+            if sse_event_queue in subscribers:
+                subscribers.remove(sse_event_queue)
+
+    def _buffer_event(
+        self,
+        task_id: str,
+        event: TaskStatusUpdateEvent | TaskArtifactUpdateEvent,
+    ):
+        """Numbers the event and keeps it for replay. Needs subscriber_lock."""
+        sequence = self._task_event_sequences.get(task_id, 0) + 1
+        self._task_event_sequences[task_id] = sequence
+        event.metadata = {**(event.metadata or {}), 'sequence': sequence}
+
+        buffer = self.task_event_buffers.get(task_id)
+        if buffer is None:
+            buffer = deque(maxlen=self.event_buffer_size)
+            self.task_event_buffers[task_id] = buffer
+        buffer.append((sequence, event))
\ No newline at end of file
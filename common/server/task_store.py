@@ -0,0 +1,695 @@
+import asyncio
+import bisect
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from common.types import (
+    Artifact,
+    Message,
+    Task,
+    TaskState,
+    TaskStatus,
+    TextPart,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class MessageHistory(list):
+    """Append-only task history that memoizes the JSON of its messages.
+
+    tail() returns the last messages as a MessageHistory sharing the memo,
+    so polling a long history with tasks/get serializes each message once
+    rather than on every request. Messages must not be changed, and the
+    list must only grow by appending, once a message is in the history.
+    """
+
+    def __init__(
+        self,
+        messages=(),
+        message_json: dict[int, bytes] | None = None,
+        offset: int = 0,
+    ):
+        super().__init__(messages)
+        # position in the root history -> JSON of the message
+        self._json = {} if message_json is None else message_json
+        self._offset = offset
+
+    def tail(self, length: int) -> 'MessageHistory':
+        start = max(len(self) - length, 0)
+        return MessageHistory(self[start:], self._json, self._offset + start)
+
+    def to_json(self) -> bytes:
+        parts = []
+        for i, message in enumerate(self, self._offset):
+            data = self._json.get(i)
+            if data is None:
+                data = message.__pydantic_serializer__.to_json(
+                    message, exclude_none=True
+                )
+                self._json[i] = data
+            parts.append(data)
+        return b'[' + b','.join(parts) + b']'
+
+
+def merge_artifact_chunks(task: Task, chunks: list[Artifact]):
+    """Merges streamed artifact chunks into one artifact per index.
+
+    A chunk with append set extends the artifact at its index, and another
+    stream chunk (lastChunk set) replaces it. Artifacts that are not part
+    of a stream (neither flag set) are added alongside any others with the
+    same index, as the default index is shared. Text appended to a
+    trailing text part is collected and joined once per call, so an update
+    carrying many tokens copies the artifact's text once rather than once
+    per token. lastChunk seals the artifact; appends to a sealed artifact
+    are ignored.
+    """
+    if task.artifacts is None:
+        task.artifacts = []
+    # artifact index -> text fragments not yet joined into its last part
+    pending: dict[int, list[str]] = {}
+    for chunk in chunks:
+        _merge_chunk(task, chunk, pending)
+    for index, fragments in pending.items():
+        _join_text(_artifact_at(task, index), fragments)
+
+
+def _merge_chunk(task: Task, chunk: Artifact, pending: dict[int, list[str]]):
+    artifact = _artifact_at(task, chunk.index)
+    if artifact is None or not chunk.append:
+        fragments = pending.pop(chunk.index, [])
+        if artifact is not None:
+            if chunk.append is None and chunk.lastChunk is None:
+                _join_text(artifact, fragments)
+            else:
+                task.artifacts = [
+                    a for a in task.artifacts if a is not artifact
+                ]
+        # The chunk itself is also sent to SSE subscribers as a delta.
+        task.artifacts.append(
+            chunk.model_copy(update={'append': None}, deep=True)
+        )
+        return
+
+    if artifact.lastChunk:
+        logger.warning(
+            f'Ignoring chunk for sealed artifact {chunk.index} '
+            f'of task {task.id}'
+        )
+        return
+
+    for part in chunk.parts:
+        if isinstance(part, TextPart) and artifact.parts and isinstance(
+            artifact.parts[-1], TextPart
+        ):
+            pending.setdefault(chunk.index, []).append(part.text)
+        else:
+            _join_text(artifact, pending.pop(chunk.index, []))
+            artifact.parts.append(part.model_copy(deep=True))
+
+    if chunk.name is not None:
+        artifact.name = chunk.name
+    if chunk.description is not None:
+        artifact.description = chunk.description
+    if chunk.metadata:
+        artifact.metadata = {**(artifact.metadata or {}), **chunk.metadata}
+    artifact.lastChunk = chunk.lastChunk
+
+
+def _join_text(artifact: Artifact, fragments: list[str]):
+    if fragments:
+        last = artifact.parts[-1]
+        last.text = ''.join([last.text, *fragments])
+
+
+def _artifact_at(task: Task, index: int) -> Artifact | None:
+    for artifact in reversed(task.artifacts or []):
+        if artifact.index == index:
+            return artifact
+    return None
+
+
+class TaskStore(ABC):
+    """Storage backend behind InMemoryTaskManager.
+
+    Callers serialize access to a single task (see
+    InMemoryTaskManager.task_lock), so implementations only need to be safe
+    for concurrent access to different tasks.
+    """
+
+    @abstractmethod
+    async def get(self, task_id: str) -> Task | None:
+        pass
+
+    @abstractmethod
+    async def create(self, task: Task) -> None:
+        pass
+
+    @abstractmethod
+    async def append_history(self, task_id: str, message: Message) -> Task:
+        """Raises KeyError if the task does not exist."""
+
+    @abstractmethod
+    async def update(
+        self,
+        task_id: str,
+        status: TaskStatus,
+        artifacts: list[Artifact] | None,
+    ) -> Task:
+        """Sets the status, appending its message to the history, and
+        merges the artifact chunks into the task's artifacts (see
+        merge_artifact_chunks). Raises KeyError if the task does not exist.
+        """
+
+    @abstractmethod
+    async def delete(self, task_id: str) -> None:
+        pass
+
+    @abstractmethod
+    async def list_tasks(
+        self,
+        session_id: str | None = None,
+        state: TaskState | None = None,
+        cursor: str | None = None,
+        limit: int = 50,
+    ) -> tuple[list[Task], str | None]:
+        """Returns up to limit tasks in creation order, starting after the
+        opaque cursor, and the cursor of the next page (None on the last
+        page). Raises ValueError for a malformed cursor.
+        """
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryTaskStore(TaskStore):
+    """Keeps tasks in a dict, indexed by session and by state.
+
+    The indexes are lists of (creation sequence, task id) kept sorted, so a
+    page of tasks/list is a bisect plus a slice.
+    """
+
+    def __init__(self):
+        self.tasks: dict[str, Task] = {}
+        self._sequences: dict[str, int] = {}
+        self._next_sequence = 1
+        self._all: list[tuple[int, str]] = []
+        self._by_session: dict[str | None, list[tuple[int, str]]] = {}
+        self._by_state: dict[TaskState, list[tuple[int, str]]] = {}
+
+    async def get(self, task_id: str) -> Task | None:
+        return self.tasks.get(task_id)
+
+    async def create(self, task: Task) -> None:
+        if task.id in self.tasks:
+            self._unindex(self.tasks[task.id])
+        task.history = MessageHistory(task.history or [])
+        self.tasks[task.id] = task
+
+        entry = (self._next_sequence, task.id)
+        self._next_sequence += 1
+        self._sequences[task.id] = entry[0]
+        self._all.append(entry)
+        self._by_session.setdefault(task.sessionId, []).append(entry)
+        bisect.insort(self._by_state.setdefault(task.status.state, []), entry)
+
+    async def append_history(self, task_id: str, message: Message) -> Task:
+        task = self.tasks[task_id]
+        task.history.append(message)
+        return task
+
+    async def update(
+        self,
+        task_id: str,
+        status: TaskStatus,
+        artifacts: list[Artifact] | None,
+    ) -> Task:
+        task = self.tasks[task_id]
+        if status.state != task.status.state:
+            entry = (self._sequences[task_id], task_id)
+            _remove_entry(self._by_state[task.status.state], entry)
+            bisect.insort(self._by_state.setdefault(status.state, []), entry)
+        task.status = status
+
+        if status.message is not None:
+            task.history.append(status.message)
+
+        if artifacts is not None:
+            merge_artifact_chunks(task, artifacts)
+
+        return task
+
+    async def delete(self, task_id: str) -> None:
+        task = self.tasks.pop(task_id, None)
+        if task is not None:
+            self._unindex(task)
+
+    async def list_tasks(
+        self,
+        session_id: str | None = None,
+        state: TaskState | None = None,
+        cursor: str | None = None,
+        limit: int = 50,
+    ) -> tuple[list[Task], str | None]:
+        after = int(cursor) if cursor else 0
+        if session_id is not None:
+            entries = self._by_session.get(session_id, [])
+        elif state is not None:
+            entries = self._by_state.get(state, [])
+        else:
+            entries = self._all
+
+        tasks = []
+        start = bisect.bisect_right(entries, after, key=lambda e: e[0])
+        for sequence, task_id in entries[start:]:
+            task = self.tasks[task_id]
+            if state is not None and task.status.state != state:
+                continue
+            if len(tasks) == limit:
+                return tasks, str(last_sequence)
+            tasks.append(task)
+            last_sequence = sequence
+        return tasks, None
+
+    def _unindex(self, task: Task):
+        entry = (self._sequences.pop(task.id), task.id)
+        _remove_entry(self._all, entry)
+        _remove_entry(self._by_session[task.sessionId], entry)
+        if not self._by_session[task.sessionId]:
+            del self._by_session[task.sessionId]
+        _remove_entry(self._by_state[task.status.state], entry)
+
+
+def _remove_entry(entries: list[tuple[int, str]], entry: tuple[int, str]):
+    i = bisect.bisect_left(entries, entry)
+    if i < len(entries) and entries[i] == entry:
+        del entries[i]
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    session_id TEXT,
+    state TEXT NOT NULL,
+    status TEXT NOT NULL,
+    metadata TEXT,
+    version INTEGER NOT NULL DEFAULT 1,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS task_history (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS task_history_task_id
+    ON task_history (task_id, seq);
+CREATE TABLE IF NOT EXISTS task_artifacts (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL,
+    artifact TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS task_artifacts_task_id
+    ON task_artifacts (task_id, seq);
+CREATE INDEX IF NOT EXISTS tasks_session_id ON tasks (session_id);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state);
+"""
+
+_BUMP_VERSION = (
+    'UPDATE tasks SET version = version + 1, updated_at = ? WHERE id = ?'
+)
+
+
+class SQLiteTaskStore(TaskStore):
+    """Task store backed by a SQLite database in WAL mode.
+
+    Several worker processes on one host can share the same database file.
+    History messages and artifact chunks are stored as append-only rows. Writes
+    are queued and committed in batches, either every flush_interval
+    seconds or once batch_size statements are pending, whichever comes
+    first. Other processes see a write only after its batch commits, and
+    writes still queued at exit are lost unless close() is called (A2AServer
+    does so on shutdown through the task manager).
+
+    Recently used tasks stay in a read-through LRU cache of cache_size
+    entries. When revalidate_cache is set, each cache hit checks the row
+    version, so changes made by other processes are picked up. Single
+    process deployments can turn it off.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        cache_size: int = 1024,
+        batch_size: int = 256,
+        flush_interval: float = 0.05,
+        revalidate_cache: bool = True,
+    ):
+        self.path = path
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.revalidate_cache = revalidate_cache
+
+        # Point reads run on the event loop; loads and batched writes run in
+        # a worker thread on their own connection.
+        self._read_conn = self._connect()
+        self._write_conn = self._connect()
+        self._write_conn.executescript(_SCHEMA)
+        self._write_lock = threading.Lock()
+
+        # task id -> (task, version last seen in the database)
+        self._cache: OrderedDict[str, tuple[Task, int]] = OrderedDict()
+        self._pending: list[tuple[str, tuple]] = []
+        self._pending_task_ids: set[str] = set()
+        # task id -> version bumps queued since the cached version
+        self._pending_bumps: dict[str, int] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=5000')
+        return conn
+
+    async def get(self, task_id: str) -> Task | None:
+        cached = self._cache.get(task_id)
+        if cached is not None:
+            task, version = cached
+            if (
+                not self.revalidate_cache
+                or task_id in self._pending_task_ids
+                or self._read_version(task_id) == version
+            ):
+                self._cache.move_to_end(task_id)
+                return task
+
+        if task_id in self._pending_task_ids:
+            # Writes for an uncached task must be visible to the load.
+            await self.flush()
+
+        loaded = await asyncio.to_thread(self._load, task_id)
+        if loaded is None:
+            self._cache.pop(task_id, None)
+            return None
+
+        self._cache_put(*loaded)
+        return loaded[0]
+
+    async def create(self, task: Task) -> None:
+        now = time.time()
+        self._queue(
+            task.id,
+            'INSERT OR REPLACE INTO tasks (id, session_id, state, status, '
+            'metadata, version, updated_at) VALUES (?, ?, ?, ?, ?, 1, ?)',
+            (
+                task.id,
+                task.sessionId,
+                task.status.state.value,
+                task.status.model_dump_json(exclude_none=True),
+                None if task.metadata is None else json.dumps(task.metadata),
+                now,
+            ),
+        )
+        self._pending_bumps[task.id] = 0
+        for table in ('task_history', 'task_artifacts'):
+            self._queue(
+                task.id, f'DELETE FROM {table} WHERE task_id = ?', (task.id,)
+            )
+        task.history = MessageHistory(task.history or [])
+        for message in task.history:
+            self._queue_history(task.id, message)
+        for artifact in task.artifacts or []:
+            self._queue_artifact(task.id, artifact)
+
+        self._cache_put(task, 1)
+        await self._schedule_flush()
+
+    async def append_history(self, task_id: str, message: Message) -> Task:
+        task = await self._get_or_raise(task_id)
+        task.history.append(message)
+
+        self._queue_history(task_id, message)
+        self._queue(task_id, _BUMP_VERSION, (time.time(), task_id))
+        self._bump(task_id)
+        await self._schedule_flush()
+        return task
+
+    async def update(
+        self,
+        task_id: str,
+        status: TaskStatus,
+        artifacts: list[Artifact] | None,
+    ) -> Task:
+        task = await self._get_or_raise(task_id)
+        task.status = status
+        self._queue(
+            task_id,
+            'UPDATE tasks SET state = ?, status = ?, version = version + 1, '
+            'updated_at = ? WHERE id = ?',
+            (
+                status.state.value,
+                status.model_dump_json(exclude_none=True),
+                time.time(),
+                task_id,
+            ),
+        )
+        self._bump(task_id)
+
+        if status.message is not None:
+            task.history.append(status.message)
+            self._queue_history(task_id, status.message)
+
+        if artifacts is not None:
+            merge_artifact_chunks(task, artifacts)
+            for artifact in artifacts:
+                self._queue_artifact(task_id, artifact)
+
+        await self._schedule_flush()
+        return task
+
+    async def delete(self, task_id: str) -> None:
+        for table in ('tasks', 'task_history', 'task_artifacts'):
+            column = 'id' if table == 'tasks' else 'task_id'
+            self._queue(
+                task_id, f'DELETE FROM {table} WHERE {column} = ?', (task_id,)
+            )
+        self._cache.pop(task_id, None)
+        self._pending_bumps.pop(task_id, None)
+        await self._schedule_flush()
+
+    async def list_tasks(
+        self,
+        session_id: str | None = None,
+        state: TaskState | None = None,
+        cursor: str | None = None,
+        limit: int = 50,
+    ) -> tuple[list[Task], str | None]:
+        after = int(cursor) if cursor else 0
+        await self.flush()
+
+        query = 'SELECT rowid, id FROM tasks WHERE rowid > ?'
+        params: list = [after]
+        if session_id is not None:
+            query += ' AND session_id = ?'
+            params.append(session_id)
+        if state is not None:
+            query += ' AND state = ?'
+            params.append(state.value)
+        query += ' ORDER BY rowid LIMIT ?'
+        params.append(limit + 1)
+        rows = self._read_conn.execute(query, params).fetchall()
+
+        tasks = []
+        for _, task_id in rows[:limit]:
+            task = await self.get(task_id)
+            if task is not None:
+                tasks.append(task)
+        next_cursor = str(rows[limit - 1][0]) if len(rows) > limit else None
+        return tasks, next_cursor
+
+    async def flush(self) -> None:
+        """Commits all queued writes in one transaction.
+
+        If the commit fails, the writes stay queued for the next flush and
+        the error is raised.
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return
+
+            batch, self._pending = self._pending, []
+            task_ids, self._pending_task_ids = self._pending_task_ids, set()
+            bumps, self._pending_bumps = self._pending_bumps, {}
+            try:
+                versions = await asyncio.to_thread(
+                    self._write_batch, batch, task_ids
+                )
+            except Exception:
+                # Writes queued meanwhile must still commit after these.
+                self._pending[:0] = batch
+                self._pending_task_ids |= task_ids
+                for task_id, count in self._pending_bumps.items():
+                    bumps[task_id] = bumps.get(task_id, 0) + count
+                self._pending_bumps = bumps
+                raise
+
+        for task_id in task_ids:
+            cached = self._cache.get(task_id)
+            if cached is None:
+                continue
+            expected = cached[1] + bumps.get(task_id, 0)
+            if versions.get(task_id) == expected:
+                self._cache[task_id] = (cached[0], expected)
+            else:
+                # Another process changed the task too; the cached copy
+                # lacks its writes, so the next get reloads the task.
+                del self._cache[task_id]
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+        self._read_conn.close()
+        self._write_conn.close()
+
+    async def _get_or_raise(self, task_id: str) -> Task:
+        task = await self.get(task_id)
+        if task is None:
+            raise KeyError(task_id)
+        return task
+
+    def _queue(self, task_id: str, sql: str, params: tuple):
+        self._pending.append((sql, params))
+        self._pending_task_ids.add(task_id)
+
+    def _bump(self, task_id: str):
+        self._pending_bumps[task_id] = self._pending_bumps.get(task_id, 0) + 1
+
+    def _queue_history(self, task_id: str, message: Message):
+        self._queue(
+            task_id,
+            'INSERT INTO task_history (task_id, message) VALUES (?, ?)',
+            (task_id, message.model_dump_json(exclude_none=True)),
+        )
+
+    def _queue_artifact(self, task_id: str, artifact: Artifact):
+        self._queue(
+            task_id,
+            'INSERT INTO task_artifacts (task_id, artifact) VALUES (?, ?)',
+            (task_id, artifact.model_dump_json(exclude_none=True)),
+        )
+
+    async def _schedule_flush(self):
+        if len(self._pending) >= self.batch_size:
+            try:
+                await self.flush()
+            finally:
+                if self._pending:
+                    self._flush_soon()
+        else:
+            self._flush_soon()
+
+    def _flush_soon(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f'Error while flushing task store, retrying: {e}')
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    def _cache_put(self, task: Task, version: int):
+        self._cache[task.id] = (task, version)
+        self._cache.move_to_end(task.id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _read_version(self, task_id: str) -> int | None:
+        row = self._read_conn.execute(
+            'SELECT version FROM tasks WHERE id = ?', (task_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _write_batch(
+        self, batch: list[tuple[str, tuple]], task_ids: set[str]
+    ) -> dict[str, int]:
+        with self._write_lock:
+            conn = self._write_conn
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for sql, params in batch:
+                    conn.execute(sql, params)
+                versions = {
+                    task_id: version
+                    for task_id, version in conn.execute(
+                        'SELECT id, version FROM tasks WHERE id IN '
+                        f'({",".join("?" * len(task_ids))})',
+                        tuple(task_ids),
+                    )
+                }
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+            return versions
+
+    def _load(self, task_id: str) -> tuple[Task, int] | None:
+        with self._write_lock:
+            conn = self._write_conn
+            conn.execute('BEGIN')
+            try:
+                row = conn.execute(
+                    'SELECT session_id, status, metadata, version '
+                    'FROM tasks WHERE id = ?',
+                    (task_id,),
+                ).fetchone()
+                if row is None:
+                    return None
+
+                messages = conn.execute(
+                    'SELECT message FROM task_history '
+                    'WHERE task_id = ? ORDER BY seq',
+                    (task_id,),
+                ).fetchall()
+                chunks = [
+                    Artifact.model_validate_json(artifact)
+                    for (artifact,) in conn.execute(
+                        'SELECT artifact FROM task_artifacts '
+                        'WHERE task_id = ? ORDER BY seq',
+                        (task_id,),
+                    )
+                ]
+            finally:
+                conn.execute('COMMIT')
+
+        session_id, status, metadata, version = row
+        task = Task(
+            id=task_id,
+            sessionId=session_id,
+            status=TaskStatus.model_validate_json(status),
+            metadata=None if metadata is None else json.loads(metadata),
+        )
+        if chunks:
+            merge_artifact_chunks(task, chunks)
+        # The stored rows are already the JSON tasks/get responds with.
+        task.history = MessageHistory(
+            (Message.model_validate_json(m) for (m,) in messages),
+            {i: m.encode() for i, (m,) in enumerate(messages)},
+        )
+        return task, version
+
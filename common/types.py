@@ -1,3 +1,5 @@
+import base64
+
 from datetime import datetime
 from enum import Enum
 from typing import Annotated, Any, Literal, Self
@@ -7,6 +9,7 @@ from pydantic import (
     BaseModel,
     ConfigDict,
     Field,
+    PrivateAttr,
     TypeAdapter,
     field_serializer,
     model_validator,
@@ -35,6 +38,32 @@ class FileContent(BaseModel):
     bytes: str | None = None
     uri: str | None = None
 
+    # (base64 text, raw content) of the last binary encoding or decoding.
+    _raw: Any = PrivateAttr(default=None)
+
+    @model_validator(mode='wrap')
+    @classmethod
+    def accept_raw_bytes(cls, data: Any, handler) -> Self:
+        # Binary wire formats (MessagePack) carry the content as raw bytes.
+        # The field stays base64 text, so this costs an encode per decode.
+        raw = data.get('bytes') if isinstance(data, dict) else None
+        if not isinstance(raw, bytes | bytearray):
+            return handler(data)
+        text = base64.b64encode(raw).decode('ascii')
+        content = handler({**data, 'bytes': text})
+        content._raw = (text, raw)
+        return content
+
+    @field_serializer('bytes')
+    def serialize_bytes(self, value: str | None, info) -> Any:
+        # Serialized with context={'binary': True}, the content is dumped
+        # as raw bytes instead of base64 text.
+        if value is None or not (info.context and info.context.get('binary')):
+            return value
+        if self._raw is None or self._raw[0] is not value:
+            self._raw = (value, base64.b64decode(value))
+        return self._raw[1]
+
     @model_validator(mode='after')
     def check_content(self) -> Self:
         if not (self.bytes or self.uri):
@@ -133,6 +162,12 @@ class TaskQueryParams(TaskIdParams):
     historyLength: int | None = None
 
 
+class TaskResubscriptionParams(TaskIdParams):
+    # Sequence number (event metadata 'sequence') of the last event the
+    # client received; newer events still buffered are replayed first.
+    lastSequence: int | None = None
+
+
 class TaskSendParams(BaseModel):
     id: str
     sessionId: str = Field(default_factory=lambda: uuid4().hex)
@@ -143,6 +178,20 @@ class TaskSendParams(BaseModel):
     metadata: dict[str, Any] | None = None
 
 
+class ListTasksParams(BaseModel):
+    sessionId: str | None = None
+    state: TaskState | None = None
+    cursor: str | None = None
+    limit: int = Field(default=50, ge=1, le=1000)
+    historyLength: int | None = None
+    metadata: dict[str, Any] | None = None
+
+
+class ListTasksResult(BaseModel):
+    tasks: list[Task]
+    nextCursor: str | None = None
+
+
 class TaskPushNotificationConfig(BaseModel):
     id: str
     pushNotificationConfig: PushNotificationConfig
@@ -232,7 +281,16 @@ class GetTaskPushNotificationResponse(JSONRPCResponse):
 
 class TaskResubscriptionRequest(JSONRPCRequest):
     method: Literal['tasks/resubscribe',] = 'tasks/resubscribe'
-    params: TaskIdParams
+    params: TaskResubscriptionParams
+
+
+class ListTasksRequest(JSONRPCRequest):
+    method: Literal['tasks/list',] = 'tasks/list'
+    params: ListTasksParams = Field(default_factory=ListTasksParams)
+
+
+class ListTasksResponse(JSONRPCResponse):
+    result: ListTasksResult | None = None
 
 
 A2ARequest = TypeAdapter(
@@ -243,7 +301,8 @@ A2ARequest = TypeAdapter(
         | SetTaskPushNotificationRequest
         | GetTaskPushNotificationRequest
         | TaskResubscriptionRequest
-        | SendTaskStreamingRequest,
+        | SendTaskStreamingRequest
+        | ListTasksRequest,
         Field(discriminator='method'),
     ]
 )
@@ -1,6 +1,8 @@
+import asyncio
 import hashlib
 import json
 import logging
+import os
 import time
 import uuid
 
@@ -10,64 +12,144 @@ import httpx
 import jwt
 
 from jwcrypto import jwk
-from jwt import PyJWK, PyJWKClient
+from jwt import PyJWK
+from jwt.exceptions import PyJWKError
 from starlette.requests import Request
 from starlette.responses import JSONResponse
 
+from common.utils.push_notification_delivery import PushNotificationDelivery
+
 
 logger = logging.getLogger(__name__)
 AUTH_HEADER_PREFIX = 'Bearer '
 
+# JWS algorithm -> parameters of the key generated for it. EdDSA and ES256
+# sign far faster than RS256 and their keys are generated in microseconds.
+SIGNING_KEY_PARAMS: dict[str, dict[str, Any]] = {
+    'RS256': {'kty': 'RSA', 'size': 2048},
+    'ES256': {'kty': 'EC', 'crv': 'P-256'},
+    'EdDSA': {'kty': 'OKP', 'crv': 'Ed25519'},
+}
+
 
 class PushNotificationAuth:
-    def _calculate_request_body_sha256(self, data: dict[str, Any]):
-        """Calculates the SHA256 hash of a request body.
+    @staticmethod
+    def _canonical_body(data: dict[str, Any]) -> bytes:
+        """Serializes a request body to the bytes its digest is taken over.
 
         This logic needs to be same for both the agent who signs the payload and the client verifier.
         """
-        body_str = json.dumps(
+        return json.dumps(
             data,
             ensure_ascii=False,
             allow_nan=False,
             indent=None,
             separators=(',', ':'),
-        )
-        return hashlib.sha256(body_str.encode()).hexdigest()
+        ).encode()
+
+    def _calculate_request_body_sha256(self, data: dict[str, Any]):
+        """Calculates the SHA256 hash of a request body."""
+        return hashlib.sha256(self._canonical_body(data)).hexdigest()
 
 
 class PushNotificationSenderAuth(PushNotificationAuth):
-    def __init__(self):
+    """Signs push notifications with the newest of its active keys.
+
+    generate_jwk() rotates in a new key for algorithm; the previous keys
+    stay published on the JWKS endpoint (up to max_active_keys in total) so
+    that notifications signed just before a rotation still verify. With
+    key_path set, the private keys are saved there and load_or_generate_jwk()
+    reuses them on startup instead of generating a new key.
+    """
+
+    def __init__(
+        self,
+        delivery: PushNotificationDelivery | None = None,
+        algorithm: str = 'RS256',
+        key_path: str | None = None,
+        max_active_keys: int = 2,
+    ):
+        if algorithm not in SIGNING_KEY_PARAMS:
+            raise ValueError(f'Unsupported signing algorithm: {algorithm}')
+        self.algorithm = algorithm
+        self.key_path = key_path
+        self.max_active_keys = max_active_keys
         self.public_keys = []
         self.private_key_jwk: PyJWK = None
+        # Private keys in JWK form, oldest first; the last one signs.
+        self._private_keys: list[dict[str, Any]] = []
+        # Tokens for the current second, by body digest, so a payload sent
+        # to several URLs is signed once.
+        self._token_iat = 0
+        self._tokens: dict[str, str] = {}
+        # Queues, signs and sends notifications over a shared connection
+        # pool; see PushNotificationDelivery for the retry policy.
+        self.delivery = delivery or PushNotificationDelivery()
 
-    @staticmethod
-    async def verify_push_notification_url(url: str) -> bool:
-        async with httpx.AsyncClient(timeout=10) as client:
-            try:
-                validation_token = str(uuid.uuid4())
-                response = await client.get(
-                    url, params={'validationToken': validation_token}
-                )
-                response.raise_for_status()
-                is_verified = response.text == validation_token
+    async def verify_push_notification_url(self, url: str) -> bool:
+        try:
+            validation_token = str(uuid.uuid4())
+            response = await self.delivery.client.get(
+                url, params={'validationToken': validation_token}
+            )
+            response.raise_for_status()
+            is_verified = response.text == validation_token
 
-                logger.info(
-                    f'Verified push-notification URL: {url} => {is_verified}'
-                )
-                return is_verified
-            except Exception as e:
-                logger.warning(
-                    f'Error during sending push-notification for URL {url}: {e}'
-                )
+            logger.info(
+                f'Verified push-notification URL: {url} => {is_verified}'
+            )
+            return is_verified
+        except Exception as e:
+            logger.warning(
+                f'Error during sending push-notification for URL {url}: {e}'
+            )
 
         return False
 
     def generate_jwk(self):
         key = jwk.JWK.generate(
-            kty='RSA', size=2048, kid=str(uuid.uuid4()), use='sig'
+            **SIGNING_KEY_PARAMS[self.algorithm],
+            kid=str(uuid.uuid4()),
+            use='sig',
+            alg=self.algorithm,
         )
-        self.public_keys.append(key.export_public(as_dict=True))
-        self.private_key_jwk = PyJWK.from_json(key.export_private())
+        self._private_keys.append(key.export_private(as_dict=True))
+        del self._private_keys[: -self.max_active_keys]
+        self._activate_keys()
+        if self.key_path is not None:
+            self._save_keys()
+
+    def load_jwk(self) -> bool:
+        """Loads the keys saved at key_path. Returns False if there are none."""
+        if self.key_path is None or not os.path.exists(self.key_path):
+            return False
+        with open(self.key_path) as f:
+            self._private_keys = json.load(f)['keys']
+        if not self._private_keys:
+            return False
+        self._activate_keys()
+        return True
+
+    def load_or_generate_jwk(self):
+        if not self.load_jwk():
+            self.generate_jwk()
+
+    def _activate_keys(self):
+        self.public_keys = [
+            jwk.JWK(**key).export_public(as_dict=True)
+            for key in self._private_keys
+        ]
+        self.private_key_jwk = PyJWK(self._private_keys[-1])
+        self._tokens.clear()
+
+    def _save_keys(self):
+        # Written to a private file next to key_path, then swapped in, so a
+        # crash never leaves a truncated key file behind.
+        tmp_path = f'{self.key_path}.tmp'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'keys': self._private_keys}, f)
+        os.replace(tmp_path, self.key_path)
 
     def handle_jwks_endpoint(self, _request: Request):
         """Allow clients to fetch public keys."""
@@ -79,41 +161,142 @@ class PushNotificationSenderAuth(PushNotificationAuth):
         Payload is signed with private key and it ensures the integrity of payload for client.
         Including iat prevents from replay attack.
         """
+        return self._sign_body_sha256(self._calculate_request_body_sha256(data))
+
+    def _sign_body_sha256(self, body_sha256: str) -> str:
         iat = int(time.time())
+        if iat != self._token_iat:
+            self._token_iat = iat
+            self._tokens.clear()
 
-        return jwt.encode(
-            {
-                'iat': iat,
-                'request_body_sha256': self._calculate_request_body_sha256(
-                    data
-                ),
-            },
-            key=self.private_key_jwk,
-            headers={'kid': self.private_key_jwk.key_id},
-            algorithm='RS256',
-        )
+        token = self._tokens.get(body_sha256)
+        if token is None:
+            token = jwt.encode(
+                {'iat': iat, 'request_body_sha256': body_sha256},
+                key=self.private_key_jwk,
+                headers={'kid': self.private_key_jwk.key_id},
+                algorithm=self.private_key_jwk.algorithm_name,
+            )
+            self._tokens[body_sha256] = token
+        return token
 
-    async def send_push_notification(self, url: str, data: dict[str, Any]):
-        jwt_token = self._generate_jwt(data)
-        headers = {'Authorization': f'Bearer {jwt_token}'}
-        async with httpx.AsyncClient(timeout=10) as client:
-            try:
-                response = await client.post(url, json=data, headers=headers)
-                response.raise_for_status()
-                logger.info(f'Push-notification sent for URL: {url}')
-            except Exception as e:
-                logger.warning(
-                    f'Error during sending push-notification for URL {url}: {e}'
-                )
+    def _signed_request(
+        self, data: dict[str, Any]
+    ) -> tuple[bytes, dict[str, str]]:
+        # The canonical bytes are both hashed and sent, so the receiver can
+        # verify the digest over the raw request body.
+        body = self._canonical_body(data)
+        token = self._sign_body_sha256(hashlib.sha256(body).hexdigest())
+        return body, {
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json',
+        }
+
+    async def send_push_notification(
+        self, url: str, data: dict[str, Any]
+    ) -> bool:
+        """Queues the notification for delivery.
+
+        The JWT is generated when the notification is sent, so a coalesced
+        or retried notification carries a fresh iat. Returns False if the
+        delivery queue is full.
+        """
+        return self.delivery.submit(url, data, self._signed_request)
+
+    async def close(self):
+        await self.delivery.stop()
 
 
 class PushNotificationReceiverAuth(PushNotificationAuth):
-    def __init__(self):
+    """Verifies push notifications against the sender's JWKS.
+
+    The keys are fetched asynchronously and cached for jwks_ttl seconds. A
+    token with an unknown kid triggers a refetch, so rotated keys are
+    picked up. Fetches, failed ones included, are attempted at most once
+    every jwks_min_refetch_interval seconds, so neither bogus kids nor an
+    unreachable JWKS endpoint stall verification. If a refetch fails, the
+    cached keys are kept.
+
+    With verify_raw_body, the digest is taken over the request bytes as
+    received, which requires the sender to post the canonical JSON (as
+    PushNotificationSenderAuth does). Otherwise the body is parsed and
+    re-serialized first.
+    """
+
+    def __init__(
+        self,
+        verify_raw_body: bool = False,
+        jwks_ttl: float = 300.0,
+        jwks_min_refetch_interval: float = 10.0,
+        client: httpx.AsyncClient | None = None,
+    ):
         self.public_keys_jwks = []
-        self.jwks_client = None
+        self.jwks_url: str | None = None
+        self.verify_raw_body = verify_raw_body
+        self.jwks_ttl = jwks_ttl
+        self.jwks_min_refetch_interval = jwks_min_refetch_interval
+        self._owns_client = client is None
+        self._client = client
+        # kid -> parsed key, from the last successful fetch
+        self._signing_keys: dict[str, PyJWK] = {}
+        self._jwks_fetched_at = float('-inf')
+        self._jwks_attempted_at = float('-inf')
+        self._jwks_lock = asyncio.Lock()
 
     async def load_jwks(self, jwks_url: str):
-        self.jwks_client = PyJWKClient(jwks_url)
+        self.jwks_url = jwks_url
+        await self._refresh_jwks()
+
+    async def close(self):
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get_signing_key(self, kid: str | None) -> PyJWK:
+        now = time.monotonic()
+        key = self._signing_keys.get(kid)
+        age = now - self._jwks_fetched_at
+        if key is not None and age < self.jwks_ttl:
+            return key
+        if now - self._jwks_attempted_at >= self.jwks_min_refetch_interval:
+            await self._refresh_jwks(stale_before=now)
+            key = self._signing_keys.get(kid)
+        if key is None:
+            raise ValueError(f'Unknown signing key: {kid}')
+        return key
+
+    async def _refresh_jwks(self, stale_before: float | None = None):
+        async with self._jwks_lock:
+            if (
+                stale_before is not None
+                and self._jwks_attempted_at >= stale_before
+            ):
+                # Another verification fetched the keys while we waited.
+                return
+
+            if self._client is None:
+                self._client = httpx.AsyncClient(timeout=10)
+            try:
+                response = await self._client.get(self.jwks_url)
+                response.raise_for_status()
+                keys = response.json()['keys']
+            except Exception as e:
+                logger.warning(f'Error fetching JWKS {self.jwks_url}: {e}')
+                if not self._signing_keys:
+                    raise
+                return
+            finally:
+                self._jwks_attempted_at = time.monotonic()
+
+            signing_keys = {}
+            for key in keys:
+                try:
+                    signing_keys[key['kid']] = PyJWK(key)
+                except (KeyError, PyJWKError) as e:
+                    logger.warning(f'Skipping unusable JWK: {e}')
+            self.public_keys_jwks = keys
+            self._signing_keys = signing_keys
+            self._jwks_fetched_at = time.monotonic()
 
     async def verify_push_notification(self, request: Request) -> bool:
         auth_header = request.headers.get('Authorization')
@@ -122,18 +305,24 @@ class PushNotificationReceiverAuth(PushNotificationAuth):
             return False
 
         token = auth_header[len(AUTH_HEADER_PREFIX) :]
-        signing_key = self.jwks_client.get_signing_key_from_jwt(token)
+        signing_key = await self._get_signing_key(
+            jwt.get_unverified_header(token).get('kid')
+        )
 
         decode_token = jwt.decode(
             token,
             signing_key,
             options={'require': ['iat', 'request_body_sha256']},
-            algorithms=['RS256'],
+            algorithms=list(SIGNING_KEY_PARAMS),
         )
 
-        actual_body_sha256 = self._calculate_request_body_sha256(
-            await request.json()
-        )
+        if self.verify_raw_body:
+            body = await request.body()
+            actual_body_sha256 = hashlib.sha256(body).hexdigest()
+        else:
+            actual_body_sha256 = self._calculate_request_body_sha256(
+                await request.json()
+            )
         if actual_body_sha256 != decode_token['request_body_sha256']:
             # Payload signature does not match the digest in signed token.
             raise ValueError('Invalid request body')
@@ -0,0 +1,272 @@
+import asyncio
+import logging
+import random
+import time
+
+from collections.abc import Callable
+from typing import Any
+
+import httpx
+
+
+logger = logging.getLogger(__name__)
+
+# Encodes a notification and signs it; returns the request body and headers
+# (e.g. the JWT over the body digest).
+RequestSigner = Callable[[dict[str, Any]], tuple[bytes, dict[str, str]]]
+
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class _Notification:
+    __slots__ = ('attempt', 'data', 'enqueued_at', 'generation', 'key', 'sign')
+
+    def __init__(
+        self,
+        key: tuple[str, Any],
+        data: dict[str, Any],
+        sign: RequestSigner | None,
+        generation: int,
+    ):
+        self.key = key
+        self.data = data
+        self.sign = sign
+        self.generation = generation
+        self.attempt = 0
+        self.enqueued_at = time.monotonic()
+
+
+class PushNotificationDelivery:
+    """Delivers push notifications from a bounded queue.
+
+    Workers post notifications over one shared httpx.AsyncClient, so
+    connections to a webhook are reused rather than opened per
+    notification. A notification for a (url, task id) pair that is still
+    queued is replaced by a newer one, so only the latest task status is
+    sent; a retry is dropped once a newer notification for the pair has
+    been submitted. Failed deliveries (transport errors and retryable
+    status codes) are retried up to max_attempts times with exponential
+    backoff and full jitter. Workers are started lazily on the first
+    submit.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient | None = None,
+        num_workers: int = 8,
+        max_queue_size: int = 1024,
+        max_attempts: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        timeout: float = 10.0,
+        max_connections: int = 100,
+    ):
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+        self.num_workers = num_workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._queue: asyncio.Queue[tuple[str, Any]] = asyncio.Queue(
+            maxsize=max_queue_size
+        )
+        # (url, task id) -> notification waiting in the queue
+        self._pending: dict[tuple[str, Any], _Notification] = {}
+        # (url, task id) -> generation of the latest submitted notification,
+        # while one is queued, in flight or waiting to be retried
+        self._generations: dict[tuple[str, Any], int] = {}
+        self._next_generation = 1
+        self._retries: set[asyncio.Task] = set()
+        self._workers: list[asyncio.Task] = []
+
+        self.in_flight = 0
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self._total_latency = 0.0
+
+    def submit(
+        self,
+        url: str,
+        data: dict[str, Any],
+        sign: RequestSigner | None = None,
+    ) -> bool:
+        """Queues a notification without blocking.
+
+        Returns False if the queue is full and the notification is dropped.
+        """
+        key = (url, data.get('id'))
+        generation = self._next_generation
+        queued = self._pending.get(key)
+        if queued is not None:
+            self._next_generation += 1
+            self._generations[key] = generation
+            queued.data = data
+            queued.sign = sign
+            queued.generation = generation
+            self.coalesced += 1
+            return True
+
+        if self._queue.full():
+            self.dropped += 1
+            logger.warning(f'Push-notification queue full, dropping {url}')
+            return False
+
+        self._next_generation += 1
+        self._generations[key] = generation
+        self._start_workers()
+        self._pending[key] = _Notification(key, data, sign, generation)
+        self._queue.put_nowait(key)
+        self.enqueued += 1
+        return True
+
+    async def join(self):
+        """Waits until every queued notification has been handled."""
+        await self._queue.join()
+
+    async def stop(self):
+        """Cancels the workers and pending retries, and closes the client
+        if it was created here.
+        """
+        tasks = [*self._retries, *self._workers]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._retries.clear()
+        self._workers = []
+        if self._owns_client:
+            await self.client.aclose()
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            'queue_depth': self._queue.qsize(),
+            'in_flight': self.in_flight,
+            'enqueued': self.enqueued,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+            'delivered': self.delivered,
+            'retried': self.retried,
+            'failed': self.failed,
+            'last_latency_seconds': self.last_latency,
+            'max_latency_seconds': self.max_latency,
+            'mean_latency_seconds': (
+                self._total_latency / self.delivered if self.delivered else 0.0
+            ),
+        }
+
+    def _start_workers(self):
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(self.num_workers)
+        ]
+
+    async def _worker(self):
+        while True:
+            key = await self._queue.get()
+            notification = self._pending.pop(key, None)
+            try:
+                if notification is not None:
+                    self.in_flight += 1
+                    await self._deliver(notification)
+            except Exception as e:
+                logger.error(f'Error in push-notification worker: {e}')
+            finally:
+                if notification is not None:
+                    self.in_flight -= 1
+                self._queue.task_done()
+
+    async def _deliver(self, notification: _Notification):
+        url, data = notification.key[0], notification.data
+        notification.attempt += 1
+        try:
+            if notification.sign is None:
+                response = await self.client.post(url, json=data)
+            else:
+                body, headers = notification.sign(data)
+                response = await self.client.post(
+                    url, content=body, headers=headers
+                )
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            retryable = e.response.status_code in RETRYABLE_STATUS_CODES
+            self._on_failure(notification, e, retryable)
+            return
+        except httpx.TransportError as e:
+            self._on_failure(notification, e, retryable=True)
+            return
+
+        self._forget(notification)
+        latency = time.monotonic() - notification.enqueued_at
+        self.delivered += 1
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency, latency)
+        self._total_latency += latency
+        logger.info(f'Push-notification sent for URL: {url}')
+
+    def _on_failure(
+        self, notification: _Notification, error: Exception, retryable: bool
+    ):
+        url = notification.key[0]
+        if not retryable or notification.attempt >= self.max_attempts:
+            self._forget(notification)
+            self.failed += 1
+            logger.warning(
+                f'Error during sending push-notification for URL {url}: {error}'
+            )
+            return
+
+        delay = random.uniform(
+            0,
+            min(
+                self.backoff_max,
+                self.backoff_base * 2 ** (notification.attempt - 1),
+            ),
+        )
+        logger.info(
+            f'Retrying push-notification for URL {url} in {delay:.2f}s: '
+            f'{error}'
+        )
+        retry = asyncio.create_task(self._retry(notification, delay))
+        self._retries.add(retry)
+        retry.add_done_callback(self._retries.discard)
+        self.retried += 1
+
+    async def _retry(self, notification: _Notification, delay: float):
+        await asyncio.sleep(delay)
+        if self._generations.get(notification.key) != notification.generation:
+            # A newer notification for the same task supersedes this one,
+            # whether it is still queued or already delivered.
+            return
+        if self._queue.full():
+            self._forget(notification)
+            self.dropped += 1
+            logger.warning(
+                f'Push-notification queue full, dropping retry for '
+                f'{notification.key[0]}'
+            )
+            return
+        self._pending[notification.key] = notification
+        self._queue.put_nowait(notification.key)
+
+    def _forget(self, notification: _Notification):
+        """Stops tracking the pair once its latest notification is done."""
+        key = notification.key
+        if (
+            self._generations.get(key) == notification.generation
+            and key not in self._pending
+        ):
+            del self._generations[key]
@@ -0,0 +1,75 @@
+"""MessagePack encoding of JSON-RPC messages, with JSON as the fallback.
+
+msgpack is an optional dependency; without it every peer speaks JSON.
+"""
+
+from datetime import datetime
+from enum import Enum
+from typing import Any
+
+from pydantic import BaseModel
+
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+
+JSON_MEDIA_TYPE = 'application/json'
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+# Sent by clients that can read MessagePack responses.
+MSGPACK_ACCEPT = f'{MSGPACK_MEDIA_TYPE}, {JSON_MEDIA_TYPE};q=0.9'
+
+# Dumps FileContent.bytes as raw bytes rather than base64 text.
+BINARY_CONTEXT = {'binary': True}
+
+
+class MessagePackDecodeError(ValueError):
+    pass
+
+
+def msgpack_available() -> bool:
+    return msgpack is not None
+
+
+def is_msgpack(content_type: str | None) -> bool:
+    if not content_type:
+        return False
+    media_type = content_type.split(';', 1)[0].strip().lower()
+    return media_type in (MSGPACK_MEDIA_TYPE, 'application/x-msgpack')
+
+
+def accepts_msgpack(accept: str | None) -> bool:
+    """Returns True if the Accept header lists MessagePack and msgpack is
+    installed.
+    """
+    if msgpack is None or not accept:
+        return False
+    return any(is_msgpack(media_range) for media_range in accept.split(','))
+
+
+def dump_binary(model: BaseModel, **kwargs) -> Any:
+    """Dumps the model to plain Python data with file content as bytes."""
+    return model.model_dump(context=BINARY_CONTEXT, **kwargs)
+
+
+def packb(data: Any) -> bytes:
+    return msgpack.packb(data, use_bin_type=True, default=_default)
+
+
+def unpackb(data: bytes) -> Any:
+    try:
+        return msgpack.unpackb(data, raw=False)
+    except (ValueError, msgpack.UnpackException) as e:
+        raise MessagePackDecodeError(str(e)) from e
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return dump_binary(value)
+    raise TypeError(f'Cannot encode {type(value).__name__} as MessagePack')
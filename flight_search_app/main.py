@@ -14,7 +14,8 @@ from common.server.task_manager import InMemoryTaskManager
 from common.types import (
     SendTaskRequest,
     SendTaskResponse,
-    Task,
+    SendTaskStreamingRequest,
+    TaskSendParams,
     TaskStatus,
     Message,
     TextPart,
@@ -39,37 +40,32 @@ class FlightAgentTaskManager(InMemoryTaskManager):
         self.session_service = session_service
         logger.info("FlightAgentTaskManager initialized.")
 
-    async def send_task(self, request: SendTaskRequest) -> SendTaskResponse:
-        task = Task(
-            taskId=request.task.taskId,
-            name="FlightSearch",
-            inputs=request.task.inputs,
-            outputs=request.task.outputs,
-            status=TaskStatus.IN_PROGRESS,
-            logs=[],
-            artifacts=[]
-        )
-        logger.info(f"Processing task {task.taskId} for Flight Search")
-
-        result = {
-            "flight": f"Mock Flight to {request.task.inputs[0].value} on {request.task.inputs[1].value}",
-            "price": "$199"
-        }
-
-        message = Message(parts=[TextPart(text=str(result))])
-        task_state = TaskState(
-            task=task,
-            messages=[message],
-            status=TaskStatus.COMPLETED,
-        )
-
-        return SendTaskResponse(state=task_state)
+    async def on_send_task(self, request: SendTaskRequest) -> SendTaskResponse:
+        return await self.submit_task(request, self._work_for(request.params))
 
-    def on_send_task(self, task):
-        logger.info(f"Sending task: {task.taskId} with details: {task.inputs}")
+    async def on_send_task_subscribe(self, request: SendTaskStreamingRequest):
+        logger.info(f"Subscribing to task: {request.params.id}")
+        return await self.submit_task_subscribe(
+            request, self._work_for(request.params)
+        )
 
-    def on_send_task_subscribe(self, task):
-        logger.info(f"Subscribing to task: {task.taskId}")
+    def _work_for(self, params: TaskSendParams):
+        """Builds the flight search that the execution engine runs for a task."""
+        query = " ".join(
+            part.text for part in params.message.parts if isinstance(part, TextPart)
+        )
+        logger.info(f"Sending task: {params.id} with details: {query}")
+
+        async def work():
+            logger.info(f"Processing task {params.id} for Flight Search")
+            result = {
+                "flight": f"Mock Flight for '{query}'",
+                "price": "$199"
+            }
+            message = Message(role="agent", parts=[TextPart(text=str(result))])
+            return TaskStatus(state=TaskState.COMPLETED, message=message), None
+
+        return work
 
 
 @asynccontextmanager
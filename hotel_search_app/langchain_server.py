@@ -14,7 +14,8 @@ from common.types import (
     AgentCard,
     SendTaskRequest,
     SendTaskResponse,
-    Task,
+    SendTaskStreamingRequest,
+    TaskSendParams,
     TaskStatus,
     Message,
     TextPart,
@@ -33,34 +34,26 @@ class HotelAgentTaskManager(InMemoryTaskManager):
         logger.info("HotelAgentTaskManager initialized.")
 
     async def on_send_task(self, request: SendTaskRequest) -> SendTaskResponse:
-        task = Task(
-            id=request.task_id,
-            name="HotelSearch",
-            input=request.input,
-            status=TaskStatus.IN_PROGRESS,
+        return await self.submit_task(request, self._work_for(request.params))
+
+    async def on_send_task_subscribe(self, request: SendTaskStreamingRequest):
+        return await self.submit_task_subscribe(
+            request, self._work_for(request.params)
         )
-        user_input = request.input.get("text", "")
 
-        logger.info(f"HotelAgentTaskManager handling task {task.id} with input: {user_input}")
+    def _work_for(self, params: TaskSendParams):
+        """Builds the agent call that the execution engine runs for a task."""
+        user_input = " ".join(
+            part.text for part in params.message.parts if isinstance(part, TextPart)
+        )
+        logger.info(f"HotelAgentTaskManager queued task {params.id} with input: {user_input}")
 
-        try:
+        async def work():
             response_text = await self.agent.process_query(user_input)
-            message = Message(parts=[TextPart(text=response_text)])
-
-            task_state = TaskState(
-                task=task,
-                messages=[message],
-                status=TaskStatus.COMPLETED,
-            )
-            return SendTaskResponse(state=task_state)
-
-        except Exception as e:
-            logger.error(f"Error processing hotel search task: {e}")
-            raise
+            message = Message(role="agent", parts=[TextPart(text=response_text)])
+            return TaskStatus(state=TaskState.COMPLETED, message=message), None
 
-    async def on_send_task_subscribe(self, request: SendTaskRequest) -> SendTaskResponse:
-        # For now, you can implement this similarly or raise NotImplementedError
-        raise NotImplementedError("Streaming task subscription is not implemented yet.")
+        return work
 
 async def run_server():
     logger.info("Starting Hotel Search A2A Server initialization...")
@@ -82,7 +75,7 @@ async def run_server():
         version="1.0.0",
         defaultInputModes=["text"],
         defaultOutputModes=["text"],
-        capabilities={"streaming": False},
+        capabilities={"streaming": True},
         skills=[
             {
                 "id": "search_hotels",
@@ -3,6 +3,8 @@ import uuid
 import httpx
 from typing import Optional, Dict, Any
 
+from common.client import new_http_client
+
 # Base URLs for the A2A compliant agent APIs
 FLIGHT_SEARCH_API_URL = os.getenv("FLIGHT_SEARCH_API_URL", "http://localhost:8000")
 HOTEL_SEARCH_API_URL = os.getenv("HOTEL_SEARCH_API_URL", "http://localhost:8003")
@@ -12,8 +14,9 @@ class A2AClientBase:
         raise NotImplementedError
 
 class FlightSearchClient(A2AClientBase):
-    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
-        self.http_client = http_client
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None, http2: bool = False):
+        # Without a shared client, keep a pooled one (HTTP/2 if http2 is set).
+        self.http_client = http_client or new_http_client(FLIGHT_SEARCH_API_URL, http2=http2)
 
     async def send_a2a_task(self, user_message: str, task_id: Optional[str] = None) -> Dict[str, Any]:
         task_id = task_id or str(uuid.uuid4())
@@ -33,18 +36,15 @@ class FlightSearchClient(A2AClientBase):
             "id": task_id
         }
 
-        if self.http_client:
-            response = await self.http_client.post(f"{FLIGHT_SEARCH_API_URL}/v1/tasks/send", json=payload)
-        else:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(f"{FLIGHT_SEARCH_API_URL}/v1/tasks/send", json=payload)
+        response = await self.http_client.post(f"{FLIGHT_SEARCH_API_URL}/v1/tasks/send", json=payload)
 
         response.raise_for_status()
         return response.json()
 
 class HotelSearchClient(A2AClientBase):
-    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
-        self.http_client = http_client
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None, http2: bool = False):
+        # Without a shared client, keep a pooled one (HTTP/2 if http2 is set).
+        self.http_client = http_client or new_http_client(HOTEL_SEARCH_API_URL, http2=http2)
 
     async def send_a2a_task(self, user_message: str, task_id: Optional[str] = None) -> Dict[str, Any]:
         task_id = task_id or str(uuid.uuid4())
@@ -64,11 +64,7 @@ class HotelSearchClient(A2AClientBase):
             "id": task_id
         }
 
-        if self.http_client:
-            response = await self.http_client.post(f"{HOTEL_SEARCH_API_URL}/v1/tasks/send", json=payload)
-        else:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(f"{HOTEL_SEARCH_API_URL}/v1/tasks/send", json=payload)
+        response = await self.http_client.post(f"{HOTEL_SEARCH_API_URL}/v1/tasks/send", json=payload)
 
         response.raise_for_status()
         return response.json()
\ No newline at end of file
@@ -3,9 +3,9 @@ import logging
 from typing import Optional
 
 import google.generativeai as genai
-import httpx
 
-from itinerary_planner.a2a.a2a_client import FlightSearchClient, HotelSearchClient
+from common.client import new_http_client
+from itinerary_planner.a2a.a2a_client import FLIGHT_SEARCH_API_URL, HOTEL_SEARCH_API_URL, FlightSearchClient, HotelSearchClient
 
 # Configure the Google Generative AI SDK
 api_key = os.getenv("GENAI_API_KEY", "your-api-key-here")
@@ -20,11 +20,14 @@ class ItineraryPlanner:
         """Initialize the itinerary planner."""
         logger.info("Initializing Itinerary Planner with google.generativeai SDK")
 
-        # Use a shared httpx client with no timeout (for testing only)
-        self.http_client = httpx.AsyncClient(timeout=None)
-
-        self.flight_client = FlightSearchClient(http_client=self.http_client)
-        self.hotel_client = HotelSearchClient(http_client=self.http_client)
+        # Use pooled httpx clients with no timeout (for testing only), one per agent.
+        # The flight and hotel agents are served by uvicorn, which speaks HTTP/1.1 only.
+        self.flight_client = FlightSearchClient(
+            http_client=new_http_client(FLIGHT_SEARCH_API_URL, timeout=None)
+        )
+        self.hotel_client = HotelSearchClient(
+            http_client=new_http_client(HOTEL_SEARCH_API_URL, timeout=None)
+        )
 
         # Create the Gemini model instance using the SDK
         self.model = genai.GenerativeModel(
@@ -0,0 +1,78 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from common.server.task_store import SQLiteTaskStore
+from common.types import Message, Task, TaskState, TaskStatus, TextPart
+
+
+def _message(text: str) -> Message:
+    return Message(role='user', parts=[TextPart(text=text)])
+
+
+def _history(task: Task) -> list[str]:
+    return [message.parts[0].text for message in task.history]
+
+
+def test_flush_keeps_writes_queued_when_the_commit_fails(tmp_path):
+    async def run():
+        path = str(tmp_path / 'tasks.db')
+        store = SQLiteTaskStore(path, flush_interval=60)
+        await store.create(
+            Task(id='t1', status=TaskStatus(state=TaskState.SUBMITTED))
+        )
+        await store.flush()
+        await store.update(
+            't1', TaskStatus(state=TaskState.COMPLETED), artifacts=None
+        )
+
+        # Another worker holds the write lock.
+        store._write_conn.execute('PRAGMA busy_timeout=0')
+        blocker = sqlite3.connect(path, isolation_level=None)
+        blocker.execute('BEGIN IMMEDIATE')
+        with pytest.raises(sqlite3.OperationalError):
+            await store.flush()
+        blocker.execute('ROLLBACK')
+        blocker.close()
+
+        await store.flush()
+        await store.close()
+
+        reopened = SQLiteTaskStore(path)
+        task = await reopened.get('t1')
+        await reopened.close()
+        return task
+
+    assert asyncio.run(run()).status.state == TaskState.COMPLETED
+
+
+def test_cache_picks_up_writes_of_another_store(tmp_path):
+    async def run():
+        path = str(tmp_path / 'tasks.db')
+        a = SQLiteTaskStore(path)
+        b = SQLiteTaskStore(path)
+        await a.create(
+            Task(
+                id='t1',
+                status=TaskStatus(state=TaskState.WORKING),
+                history=[_message('1')],
+            )
+        )
+        await a.flush()
+        await b.get('t1')
+
+        # Both append before either commits.
+        await b.append_history('t1', _message('from-b'))
+        await a.append_history('t1', _message('from-a'))
+        await b.flush()
+        await a.flush()
+
+        histories = (_history(await a.get('t1')), _history(await b.get('t1')))
+        await a.close()
+        await b.close()
+        return histories
+
+    from_a, from_b = asyncio.run(run())
+    assert from_a == ['1', 'from-b', 'from-a']
+    assert from_b == ['1', 'from-b', 'from-a']